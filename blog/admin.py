@@ -1,18 +1,35 @@
 from django.contrib import admin
 from blog.models import Post, Tag, Comment
+from blog.pagination import EstimatedCountPaginator
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('title', 'author', 'published_at', 'likes_count', 'comments_count')
+    list_select_related = ('author',)
+    list_filter = ('published_at',)
+    search_fields = ('title',)
+    autocomplete_fields = ('author', 'tags')
+    # лайков у поста могут быть тысячи, в autocomplete пришлось бы отрисовать их все
+    raw_id_fields = ('likes',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('title', 'posts_count')
+    search_fields = ('title',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('author', 'post', 'text',)
+    list_select_related = ('author', 'post')
     raw_id_fields = ('post', 'author')
+    # по одной дате публикации индекса нет, а порядок id совпадает с порядком добавления
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
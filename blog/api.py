@@ -0,0 +1,198 @@
+from functools import wraps
+
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from blog.models import Post, Tag
+from blog.pagination import KeysetPaginator
+from blog.renditions import RENDITION_SIZES, serialize_rendition
+from blog.search import highlight_snippet, search_posts
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 500
+
+# поле ответа: (колонки, которые нужно выбрать из базы, как получить значение из поста)
+POST_FIELDS = {
+    'slug': (['slug'], lambda post: post.slug),
+    'title': (['title'], lambda post: post.title),
+    'text': (['text'], lambda post: post.text),
+    'teaser_text': (['teaser'], lambda post: post.teaser),
+    'author': (['author__username'], lambda post: post.author.username),
+    'published_at': (['published_at'], lambda post: post.published_at),
+    'image_url': (['image'], lambda post: post.image.url if post.image else None),
+    'images': (
+        ['image', 'renditions'],
+        lambda post: {kind: serialize_rendition(post, kind) for kind in RENDITION_SIZES},
+    ),
+    'likes_amount': (['likes_count'], lambda post: post.likes_count),
+    'comments_amount': (['comments_count'], lambda post: post.comments_count),
+    'tags': ([], lambda post: [tag.title for tag in post.related_tags]),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def get_requested_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(POST_FIELDS)
+    fields = fields.split(',')
+    unknown_fields = set(fields) - set(POST_FIELDS)
+    if unknown_fields:
+        raise BadRequest(f'Неизвестные поля: {", ".join(sorted(unknown_fields))}')
+    return fields
+
+
+def get_page_number(request):
+    try:
+        page_number = int(request.GET.get('page', 1))
+    except ValueError:
+        raise BadRequest('page должен быть числом')
+    if page_number < 1:
+        raise BadRequest('page должен быть больше нуля')
+    return page_number
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def select_post_fields(posts, fields):
+    columns = {'id', 'published_at'}
+    for field in fields:
+        columns.update(POST_FIELDS[field][0])
+    posts = posts.only(*columns)
+    if 'author' in fields:
+        posts = posts.select_related('author')
+    if 'tags' in fields:
+        posts = posts.prefetch_with_related_tags()
+    return posts
+
+
+def serialize_api_post(post, fields):
+    return {field: POST_FIELDS[field][1](post) for field in fields}
+
+
+def paginate_posts(request, posts, url):
+    fields = get_requested_fields(request)
+    paginator = KeysetPaginator(select_post_fields(posts, fields), get_page_size(request))
+    try:
+        page = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+    except InvalidPage as error:
+        raise BadRequest(str(error))
+
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    links = {'next_url': None, 'previous_url': None}
+    if page.has_next:
+        query['after'] = page.next_cursor
+        links['next_url'] = f'{url}?{query.urlencode()}'
+        query.pop('after')
+    if page.has_previous:
+        query['before'] = page.previous_cursor
+        links['previous_url'] = f'{url}?{query.urlencode()}'
+
+    return JsonResponse({
+        'posts': [serialize_api_post(post, fields) for post in page],
+        **links,
+    })
+
+
+def handle_bad_request(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400)
+    return wrapper
+
+
+@require_GET
+@handle_bad_request
+def post_list(request):
+    return paginate_posts(request, Post.objects.all(), reverse('api_post_list'))
+
+
+@require_GET
+@handle_bad_request
+def post_detail(request, slug):
+    fields = get_requested_fields(request)
+    post = get_object_or_404(select_post_fields(Post.objects.all(), fields), slug=slug)
+    return JsonResponse(serialize_api_post(post, fields))
+
+
+@require_GET
+def tag_list(request):
+    tags = Tag.objects.popular().values('title', 'posts_count')
+    return JsonResponse({'tags': [
+        {'title': tag['title'], 'posts_with_tag': tag['posts_count']}
+        for tag in tags
+    ]})
+
+
+@require_GET
+@handle_bad_request
+def tag_post_list(request, tag_title):
+    tag = get_object_or_404(Tag.objects.only('id'), title=tag_title)
+    return paginate_posts(request, tag.posts.all(), reverse('api_tag_post_list', args=[tag_title]))
+
+
+@require_GET
+@handle_bad_request
+def search(request):
+    search_query = request.GET.get('q', '').strip()
+    if not search_query:
+        raise BadRequest('Укажите поисковый запрос в параметре q')
+    fields = get_requested_fields(request)
+    page_size = get_page_size(request)
+    page_number = get_page_number(request)
+
+    # просим на один результат больше, чтобы узнать, есть ли следующая страница
+    results = search_posts(search_query, page_size + 1, offset=(page_number - 1) * page_size)
+    has_next = len(results) > page_size
+    results = results[:page_size]
+    found_posts = select_post_fields(Post.objects.all(), fields).in_bulk([post_id for post_id, _ in results])
+
+    next_url = None
+    if has_next:
+        query = request.GET.copy()
+        query['page'] = page_number + 1
+        next_url = f"{reverse('api_search')}?{query.urlencode()}"
+    return JsonResponse({
+        'posts': [
+            {**serialize_api_post(found_posts[post_id], fields), 'snippet': highlight_snippet(snippet)}
+            for post_id, snippet in results
+            if post_id in found_posts
+        ],
+        'next_url': next_url,
+    })
+
+
+@require_GET
+@handle_bad_request
+def post_export(request):
+    fields = get_requested_fields(request)
+    posts = select_post_fields(Post.objects.order_by('-published_at', '-id'), fields)
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+    def generate_lines():
+        for post in posts.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield encoder.encode(serialize_api_post(post, fields)) + '\n'
+
+    response = StreamingHttpResponse(generate_lines(), content_type='application/x-ndjson; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="posts.ndjson"'
+    return response
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class BlogConfig(AppConfig):
     name = 'blog'
+    default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        from blog import checks, signals  # noqa: F401
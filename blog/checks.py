@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core import checks
+from django.utils.module_loading import import_string
+
+
+# Проверки запускаются командой `python3 manage.py check --deploy --tag performance`
+@checks.register('performance', deploy=True)
+def check_slow_settings(app_configs, **kwargs):
+    warnings = []
+    if settings.DEBUG:
+        warnings.append(checks.Warning(
+            'DEBUG включён: Django запоминает каждый SQL-запрос и отдаёт подробные страницы ошибок',
+            hint='Задайте PRODUCTION=true или DEBUG=false',
+            id='blog.W001',
+        ))
+    if 'debug_toolbar' in settings.INSTALLED_APPS:
+        warnings.append(checks.Warning(
+            'Debug Toolbar подключён и обрабатывает каждый запрос',
+            hint='Задайте PRODUCTION=true или DEBUG_TOOLBAR=false',
+            id='blog.W002',
+        ))
+
+    for template_settings in settings.TEMPLATES:
+        loaders = template_settings.get('OPTIONS', {}).get('loaders')
+        if loaders and not any('cached.Loader' in str(loader) for loader in loaders):
+            warnings.append(checks.Warning(
+                'Шаблоны загружаются без кэша и компилируются заново на каждый запрос',
+                hint='Оберните загрузчики в django.template.loaders.cached.Loader',
+                id='blog.W003',
+            ))
+
+    static_storage = import_string(settings.STORAGES['staticfiles']['BACKEND'])
+    if not issubclass(static_storage, ManifestFilesMixin):
+        warnings.append(checks.Warning(
+            'Статика хранится без хэшей в именах файлов, браузеры не смогут кэшировать её надолго',
+            hint='Задайте PRODUCTION=true и соберите статику командой collectstatic',
+            id='blog.W004',
+        ))
+
+    database = settings.DATABASES['default']
+    if not database.get('CONN_MAX_AGE'):
+        warnings.append(checks.Warning(
+            'Соединение с базой открывается заново на каждый запрос',
+            hint='Задайте DATABASE_CONN_MAX_AGE больше нуля',
+            id='blog.W005',
+        ))
+    if database['ENGINE'] == 'django.db.backends.sqlite3' \
+            and str(settings.SQLITE_PRAGMAS.get('journal_mode')).lower() != 'wal':
+        warnings.append(checks.Warning(
+            'SQLite работает не в режиме WAL: читатели ждут, пока закончится запись',
+            hint='Задайте SQLITE_JOURNAL_MODE=wal',
+            id='blog.W006',
+        ))
+
+    if not settings.PAGE_CACHE_TIMEOUT:
+        warnings.append(checks.Warning(
+            'Кэш страниц выключен, каждая страница собирается заново',
+            hint='Задайте PAGE_CACHE_TIMEOUT больше нуля',
+            id='blog.W007',
+        ))
+    if settings.CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+        warnings.append(checks.Warning(
+            'Кэш хранится в памяти процесса: у каждого воркера он свой, а сброс кэша не доходит до соседей',
+            hint='Задайте CACHE_BACKEND=redis или CACHE_BACKEND=file',
+            id='blog.W008',
+        ))
+        if settings.WARM_CACHE_ON_STARTUP:
+            warnings.append(checks.Warning(
+                'WARM_CACHE_ON_STARTUP не действует с кэшем в памяти процесса',
+                hint='Задайте CACHE_BACKEND=redis или CACHE_BACKEND=file',
+                id='blog.W009',
+            ))
+    return warnings
@@ -0,0 +1,92 @@
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+
+from blog.models import Post, Tag
+from blog.page_cache import FEEDS, cache_page_for_anonymous
+
+
+FEED_ITEMS_COUNT = 50
+
+
+def get_feed_items(posts):
+    # в ленту попадает только анонс, текст поста и модели целиком не нужны
+    return posts.order_by('-published_at', '-id') \
+        .values('title', 'slug', 'teaser', 'published_at', 'author__username')[:FEED_ITEMS_COUNT]
+
+
+class LatestPostsFeed(Feed):
+    title = 'Sensive Blog'
+    link = reverse_lazy('index')
+    description = 'Latest posts'
+
+    def items(self):
+        return get_feed_items(Post.objects.all())
+
+    def item_title(self, item):
+        return item['title']
+
+    def item_description(self, item):
+        return item['teaser']
+
+    def item_link(self, item):
+        return reverse('post_detail', args=[item['slug']])
+
+    def item_pubdate(self, item):
+        return item['published_at']
+
+    def item_author_name(self, item):
+        return item['author__username']
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class TagPostsFeed(LatestPostsFeed):
+
+    def get_object(self, request, tag_title):
+        return get_object_or_404(Tag.objects.only('id', 'title'), title=tag_title)
+
+    def title(self, tag):
+        return f'Sensive Blog: #{tag.title}'
+
+    def link(self, tag):
+        return reverse('tag_filter', args=[tag.title])
+
+    def description(self, tag):
+        return f'Latest posts about #{tag.title}'
+
+    def items(self, tag):
+        return get_feed_items(tag.posts.all())
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, tag):
+        return self.description(tag)
+
+
+feeds = {
+    'rss': (LatestPostsFeed(), TagPostsFeed()),
+    'atom': (LatestPostsAtomFeed(), TagPostsAtomFeed()),
+}
+
+
+@cache_page_for_anonymous
+def latest_posts(request, feed_type):
+    latest_posts_feed, _ = feeds[feed_type]
+    response = latest_posts_feed(request)
+    response.page_dependencies = [FEEDS]
+    return response
+
+
+@cache_page_for_anonymous
+def tag_posts(request, tag_title, feed_type):
+    _, tag_posts_feed = feeds[feed_type]
+    response = tag_posts_feed(request, tag_title=tag_title)
+    response.page_dependencies = [FEEDS]
+    return response
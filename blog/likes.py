@@ -0,0 +1,132 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from blog.models import Post
+from blog.page_cache import invalidate_pages, post_dependency
+from blog.sidebar import invalidate_sidebar
+
+
+logger = logging.getLogger(__name__)
+
+PostLike = Post.likes.through
+
+# Если лайков накопилось больше, буфер сбрасывается сразу, не дожидаясь таймера
+MAX_PENDING_LIKES = 1000
+# После стольких неудачных попыток подряд пачку выбрасываем, иначе одна ошибка копила бы лайки бесконечно
+MAX_FLUSH_ATTEMPTS = 5
+
+
+def apply_likes(likes):
+    # likes — {(id поста, id пользователя): True, если лайк поставлен, и False, если снят}
+    post_ids = {post_id for post_id, _ in likes}
+    unliked_users = defaultdict(list)
+    for (post_id, user_id), liked in likes.items():
+        if not liked:
+            unliked_users[post_id].append(user_id)
+
+    with transaction.atomic():
+        # пока лайк ждал в буфере, пост или пользователя могли удалить, и вставка упала бы на внешнем ключе
+        liked_pairs = [pair for pair, liked in likes.items() if liked]
+        existing_post_ids = set(
+            Post.objects.filter(pk__in={post_id for post_id, _ in liked_pairs}).values_list('pk', flat=True)
+        )
+        existing_user_ids = set(
+            get_user_model().objects.filter(pk__in={user_id for _, user_id in liked_pairs}).values_list('pk', flat=True)
+        )
+        PostLike.objects.bulk_create(
+            [
+                PostLike(post_id=post_id, user_id=user_id) for post_id, user_id in liked_pairs
+                if post_id in existing_post_ids and user_id in existing_user_ids
+            ],
+            ignore_conflicts=True,
+        )
+        for post_id, user_ids in unliked_users.items():
+            PostLike.objects.filter(post_id=post_id, user_id__in=user_ids).delete()
+        # bulk_create и delete у промежуточной модели не вызывают m2m_changed, счётчик обновляем сами
+        Post.objects.filter(pk__in=post_ids).update_likes_count()
+
+    invalidate_pages(*[post_dependency(post_id) for post_id in post_ids])
+    invalidate_sidebar()
+
+
+class LikeBuffer:
+    def __init__(self):
+        self._likes = {}
+        self._lock = threading.Lock()
+        # пачки лайков пишутся строго по очереди, иначе старая пачка могла бы перезаписать новую
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._failed_attempts = 0
+
+    def add(self, post_id, user_id, liked):
+        # настройку читаем при каждом лайке, а не при импорте, чтобы её можно было поменять в тестах
+        if settings.LIKES_FLUSH_INTERVAL <= 0:
+            apply_likes({(post_id, user_id): liked})
+            return
+
+        with self._lock:
+            # из нескольких кликов одного пользователя по одному посту важен только последний
+            self._likes[(post_id, user_id)] = liked
+            is_full = len(self._likes) >= MAX_PENDING_LIKES
+            if not is_full:
+                self._schedule_flush()
+        if is_full:
+            self.flush()
+
+    def get_pending(self, post_id, user_id):
+        # True или False, если клик пользователя ещё ждёт в буфере, и None, если ждать нечего
+        with self._lock:
+            return self._likes.get((post_id, user_id))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                likes, self._likes = self._likes, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not likes:
+                return 0
+
+            try:
+                apply_likes(likes)
+            except Exception:
+                self._failed_attempts += 1
+                if self._failed_attempts >= MAX_FLUSH_ATTEMPTS:
+                    logger.exception(
+                        'Не удалось сохранить %s лайков за %s попыток, они потеряны: %s',
+                        len(likes), self._failed_attempts, likes,
+                    )
+                    self._failed_attempts = 0
+                    return 0
+                logger.exception('Не удалось сохранить %s лайков, попробуем ещё раз', len(likes))
+                with self._lock:
+                    # лайки, поставленные за время записи, новее неудачных
+                    self._likes = {**likes, **self._likes}
+                    self._schedule_flush()
+                return 0
+            self._failed_attempts = 0
+            return len(likes)
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(settings.LIKES_FLUSH_INTERVAL, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            # у потока таймера своё соединение с базой, оставлять его открытым незачем
+            connection.close()
+
+
+like_buffer = LikeBuffer()
+atexit.register(like_buffer.flush)
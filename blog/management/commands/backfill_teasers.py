@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заполняет анонсы постов из текста пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+        while True:
+            batch_ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch_ids:
+                break
+            updated += Post.objects.filter(id__gte=batch_ids[0], id__lte=batch_ids[-1]).update_teaser()
+            last_id = batch_ids[-1]
+            self.stdout.write(f'Обновлено анонсов: {updated}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, обновлено анонсов: {updated}'))
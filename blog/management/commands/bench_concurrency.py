@@ -0,0 +1,125 @@
+import multiprocessing
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from blog.management.commands.bench_views import COLD_CACHES, get_percentile, get_view_urls
+from blog.models import Post
+
+
+# Так SQLite работает без настроек из SQLITE_PRAGMAS: читатели ждут, пока писатель закончит транзакцию
+DEFAULT_SQLITE_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+def get_benchmark_settings(default_pragmas):
+    overrides = {'ALLOWED_HOSTS': ['*'], 'CACHES': COLD_CACHES}
+    if default_pragmas:
+        overrides['SQLITE_PRAGMAS'] = DEFAULT_SQLITE_PRAGMAS
+    return overrides
+
+
+def read_pages(urls, default_pragmas, deadline, results):
+    durations = []
+    errors = 0
+    with override_settings(**get_benchmark_settings(default_pragmas)):
+        # адрес не из INTERNAL_IPS, чтобы Debug Toolbar не вмешивался в замеры
+        client = Client(REMOTE_ADDR='192.0.2.1', raise_request_exception=False)
+        while time.time() < deadline:
+            started_at = time.perf_counter()
+            response = client.get(random.choice(urls))
+            durations.append((time.perf_counter() - started_at) * 1000)
+            if response.status_code != 200:
+                errors += 1
+        connection.close()
+    results.put(('read', durations, errors))
+
+
+def write_posts(post_ids, default_pragmas, deadline, write_pause, results):
+    writes = 0
+    errors = 0
+    with override_settings(**get_benchmark_settings(default_pragmas)):
+        while time.time() < deadline:
+            try:
+                # пост пересохраняется без изменений, как после «Сохранить» в админке: данные не портятся,
+                # а запись в базу, сигналы и сброс кэшей происходят по-настоящему
+                with transaction.atomic():
+                    Post.objects.get(pk=random.choice(post_ids)).save()
+                writes += 1
+            except OperationalError:
+                errors += 1
+            time.sleep(write_pause)
+        connection.close()
+    results.put(('write', writes, errors))
+
+
+class Command(BaseCommand):
+    help = 'Замеряет, сколько страниц в секунду отдаёт блог, пока в админке правят посты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Сколько процессов читают страницы')
+        parser.add_argument('--duration', type=float, default=10, help='Сколько секунд длится замер')
+        parser.add_argument('--write-pause', type=float, default=0.05, help='Пауза между правками постов, с')
+        parser.add_argument(
+            '--default-pragmas',
+            action='store_true',
+            help='Замерить с настройками SQLite по умолчанию, чтобы сравнить с SQLITE_PRAGMAS',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда замеряет работу SQLite')
+        urls = list(get_view_urls().values())
+        post_ids = list(Post.objects.values_list('id', flat=True)[:1000])
+        default_pragmas = options['default_pragmas']
+
+        # режим журнала хранится в самом файле базы, поэтому переподключаемся с нужными PRAGMA,
+        # а перед запуском процессов закрываем соединение, чтобы они его не унаследовали
+        connections.close_all()
+        with override_settings(**get_benchmark_settings(default_pragmas)):
+            with connection.cursor() as cursor:
+                journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+            connections.close_all()
+
+        # Читатели и писатель работают в отдельных процессах, как воркеры gunicorn:
+        # в потоках одного процесса всё упёрлось бы в GIL, а не в блокировки SQLite.
+        # Процессы создаются через fork и получают уже настроенный Django
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        deadline = time.time() + options['duration']
+        processes = [
+            context.Process(target=read_pages, args=(urls, default_pragmas, deadline, results))
+            for _ in range(max(options['readers'], 1))
+        ]
+        processes.append(context.Process(
+            target=write_posts,
+            args=(post_ids, default_pragmas, deadline, options['write_pause'], results),
+        ))
+        for process in processes:
+            process.start()
+
+        durations = []
+        read_errors = writes = write_errors = 0
+        for _ in processes:
+            kind, *values = results.get()
+            if kind == 'read':
+                durations.extend(values[0])
+                read_errors += values[1]
+            else:
+                writes, write_errors = values
+        for process in processes:
+            process.join()
+
+        if len(durations) < 2:
+            raise CommandError('Не удалось прочитать ни одной страницы')
+        elapsed = options['duration']
+        self.stdout.write(f'Режим журнала: {journal_mode}, читателей: {options["readers"]}')
+        self.stdout.write(
+            f'Чтение: {len(durations) / elapsed:.1f} страниц в секунду, '
+            f'p50 {get_percentile(durations, 50):.2f} мс, p99 {get_percentile(durations, 99):.2f} мс, '
+            f'ошибок {read_errors}'
+        )
+        self.stdout.write(f'Запись: {writes / elapsed:.1f} правок в секунду, ошибок {write_errors}')
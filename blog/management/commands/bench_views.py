@@ -0,0 +1,89 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from blog.models import Post, Tag
+from blog.query_shapes import detect_repeated_queries
+
+
+# Сколько SQL-запросов разрешено каждой странице при холодном кэше.
+# Число не должно зависеть от количества постов, тегов и комментариев на странице.
+VIEW_QUERY_BUDGETS = {
+    'index': 5,
+    'post_detail': 7,
+    'tag_filter': 6,
+    'contacts': 0,
+}
+
+COLD_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+WARM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}}
+
+
+def get_view_urls():
+    post = Post.objects.order_by('-comments_count').only('slug').first()
+    tag = Tag.objects.popular().only('title').first()
+    if not post or not tag:
+        raise CommandError('База пуста, сначала запустите seed_blog')
+    return {
+        'index': reverse('index'),
+        'post_detail': reverse('post_detail', args=[post.slug]),
+        'tag_filter': reverse('tag_filter', args=[tag.title]),
+        'contacts': reverse('contacts'),
+    }
+
+
+def get_percentile(durations, percent):
+    return statistics.quantiles(durations, n=100, method='inclusive')[percent - 1]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время ответа и число SQL-запросов страниц блога и проверяет бюджет запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Сколько раз запросить каждую страницу')
+        parser.add_argument('--warm', action='store_true', help='Не отключать кэши')
+
+    def handle(self, *args, **options):
+        caches = WARM_CACHES if options['warm'] else COLD_CACHES
+        with override_settings(ALLOWED_HOSTS=['*'], CACHES=caches):
+            results = self.run_benchmark(get_view_urls(), max(options['requests'], 2))
+
+        self.stdout.write(f'{"страница":<12} {"p50, мс":>9} {"p90, мс":>9} {"p99, мс":>9} {"запросов":>9} {"бюджет":>7}')
+        over_budget = []
+        for view_name, (durations, queries_count) in results.items():
+            budget = VIEW_QUERY_BUDGETS[view_name]
+            self.stdout.write(
+                f'{view_name:<12} {get_percentile(durations, 50):>9.2f} {get_percentile(durations, 90):>9.2f} '
+                f'{get_percentile(durations, 99):>9.2f} {queries_count:>9} {budget:>7}'
+            )
+            if queries_count > budget:
+                over_budget.append(f'{view_name}: {queries_count} запросов при бюджете {budget}')
+
+        if over_budget:
+            raise CommandError('Превышен бюджет запросов:\n' + '\n'.join(over_budget))
+
+    def run_benchmark(self, urls, requests_count):
+        # адрес не из INTERNAL_IPS, чтобы Debug Toolbar не вмешивался в замеры
+        client = Client(REMOTE_ADDR='192.0.2.1')
+        results = {}
+        for view_name, url in urls.items():
+            durations = []
+            queries_count = 0
+            for _ in range(requests_count):
+                with CaptureQueriesContext(connection) as queries, \
+                        detect_repeated_queries(raise_errors=False) as detector:
+                    started_at = time.perf_counter()
+                    response = client.get(url)
+                    durations.append((time.perf_counter() - started_at) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} ответил {response.status_code}')
+                if detector.reports:
+                    raise CommandError(f'{url}: ' + '\n'.join(detector.reports))
+                queries_count = max(queries_count, len(queries))
+            results[view_name] = durations, queries_count
+        return results
@@ -0,0 +1,44 @@
+import time
+from collections import defaultdict
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post, RelatedPost
+from blog.page_cache import ALL_PAGES, invalidate_pages
+from blog.related_posts import RELATED_POSTS_COUNT, find_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Заново подбирает похожие посты по общим тегам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=RELATED_POSTS_COUNT, help='Сколько похожих постов хранить')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+        post_ids = Post.objects.order_by('-published_at', '-id').values_list('id', flat=True)
+        post_positions = {post_id: position for position, post_id in enumerate(post_ids.iterator())}
+        post_tags = defaultdict(set)
+        for post_id, tag_id in Post.tags.through.objects.values_list('post_id', 'tag_id').iterator():
+            post_tags[post_id].add(tag_id)
+
+        links = (
+            RelatedPost(post_id=post_id, related_id=related_post_id, rank=rank, score=score)
+            for post_id, related_posts in find_related_posts(post_tags, post_positions, options['count'])
+            for rank, (related_post_id, score) in enumerate(related_posts, start=1)
+        )
+        with transaction.atomic():
+            RelatedPost.objects.all().delete()
+            # bulk_create превращает аргумент в список, поэтому связи отдаём пачками, а не все сразу
+            while batch := list(islice(links, options['batch_size'])):
+                RelatedPost.objects.bulk_create(batch)
+            links_count = RelatedPost.objects.count()
+            transaction.on_commit(lambda: invalidate_pages(ALL_PAGES))
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {links_count} связей для {len(post_tags)} постов за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from blog.models import Comment, Post, Tag
+
+
+NEW_INDEXES = ['post_published_at_idx', 'comment_post_published_at_idx', 'post_likes_user_post_idx',
+               'post_tags_tag_post_idx']
+
+
+def get_hot_queries():
+    post = Post.objects.order_by('-comments_count').only('id', 'slug').first()
+    user = User.objects.order_by('-id').first()
+    tag = Tag.objects.popular().only('id').first()
+    return {
+        'Свежие посты на главной': Post.objects.order_by('-published_at', '-id')[:6],
+        'Пост по slug': Post.objects.filter(slug=post.slug),
+        'Комментарии к посту': Comment.objects.filter(post_id=post.id).order_by('published_at', 'id'),
+        'Популярные посты': Post.objects.popular()[:5],
+        'Популярные теги': Tag.objects.popular()[:5],
+        'Свежие посты с тегом': Post.objects.filter(tags=tag).order_by('-published_at', '-id')[:21],
+        'Посты, которые лайкнул пользователь': Post.likes.through.objects.filter(user_id=user.id)
+        .values_list('post_id', flat=True),
+    }
+
+
+def explain(queryset, label):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        # метка в конце запроса не даёт sqlite3 взять план из кэша подготовленных выражений
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql} /* {label} */', params)
+        return '\n'.join(row[-1] for row in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы и время горячих запросов блога с новыми индексами и без них'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Сравнение планов поддерживается только для SQLite')
+        if not Post.objects.exists():
+            raise CommandError('База пуста, сначала запустите seed_blog')
+        self.repeat = options['repeat']
+        queries = get_hot_queries()
+
+        after = self.explain(queries, 'С индексами')
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for index_name in NEW_INDEXES:
+                    cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+            before = self.explain(queries, 'Без индексов')
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Итого, медиана в мс'))
+        for name in queries:
+            self.stdout.write(f'{name}: {before[name]:.3f} → {after[name]:.3f}')
+
+    def explain(self, queries, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        timings = {}
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.SQL_KEYWORD(name))
+            self.stdout.write(explain(queryset, label))
+            durations = []
+            for _ in range(self.repeat):
+                started_at = time.perf_counter()
+                list(queryset.all())
+                durations.append((time.perf_counter() - started_at) * 1000)
+            timings[name] = statistics.median(durations)
+        return timings
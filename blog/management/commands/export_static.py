@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog.management.commands.generate_renditions import iterate_batches
+from blog.models import Comment, Post, RelatedPost, Tag
+from blog.serializers import serialize_post, serialize_related_post
+from blog.sidebar import get_sidebar
+from blog.views import COMMENTS_PER_PAGE, POSTS_PER_PAGE, TAG_POSTS_PER_PAGE
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def get_fingerprint(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def get_site_fingerprint():
+    # после правки шаблонов или новой сборки статики меняются все страницы
+    digest = hashlib.md5()
+    static_manifest_path = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+    paths = [static_manifest_path] if os.path.exists(static_manifest_path) else []
+    for root, _, file_names in os.walk(settings.TEMPLATE_DIR):
+        paths.extend(os.path.join(root, file_name) for file_name in file_names)
+    for path in sorted(paths):
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def fetch_comments(post_ids):
+    # на странице поста видна только первая страница комментариев и ссылка на следующую
+    comments = defaultdict(list)
+    rows = Comment.objects.filter(post_id__in=post_ids).order_by('post_id', 'published_at', 'id') \
+        .values_list('post_id', 'text', 'published_at', 'author__username')
+    for post_id, *comment in rows:
+        if len(comments[post_id]) <= COMMENTS_PER_PAGE:
+            comments[post_id].append(comment)
+    return comments
+
+
+def get_page_fingerprints(batch_size):
+    # Отпечаток страницы собирается из тех же данных, что видит шаблон, но без отрисовки.
+    # Страница перерисовывается, только если отпечаток изменился
+    site_fingerprint = get_site_fingerprint()
+    # боковая колонка одна на все страницы, её отпечаток считаем один раз
+    common = get_fingerprint(site_fingerprint, get_sidebar())
+    card_fingerprints = {}
+    related_card_fingerprints = {}
+    post_fingerprints = {}
+
+    posts = Post.objects.prefetch_with_related_tags().fetch_with_author().order_by('id')
+    for batch in iterate_batches(posts.iterator(chunk_size=batch_size), batch_size):
+        comments = fetch_comments([post.id for post in batch])
+        for post in batch:
+            card = serialize_post(post)
+            # число постов у тегов в карточке не выводится, а меняется с каждым новым постом
+            card_fingerprints[post.id] = get_fingerprint({**card, 'tags': [tag['title'] for tag in card['tags']]})
+            related_card_fingerprints[post.id] = get_fingerprint(serialize_related_post(post))
+            url = reverse('post_detail', args=[post.slug])
+            post_fingerprints[post.id] = url, get_fingerprint(
+                common, card, post.likes_count, post.text, comments[post.id],
+            )
+
+    # похожие посты могут идти в таблице позже самого поста, поэтому учитываем их вторым проходом
+    related_posts = defaultdict(list)
+    links = RelatedPost.objects.order_by('post_id', 'rank').values_list('post_id', 'related_id')
+    for post_id, related_id in links.iterator(chunk_size=batch_size * 10):
+        related_posts[post_id].append(related_card_fingerprints[related_id])
+
+    fingerprints = {reverse('contacts'): site_fingerprint}
+    for post_id, (url, post_fingerprint) in post_fingerprints.items():
+        fingerprints[url] = get_fingerprint(post_fingerprint, related_posts[post_id])
+
+    index_post_ids = Post.objects.order_by('-published_at', '-id').values_list('id', flat=True)[:POSTS_PER_PAGE + 1]
+    fingerprints[reverse('index')] = get_fingerprint(
+        common, [card_fingerprints[post_id] for post_id in index_post_ids],
+    )
+    for tag in Tag.objects.all():
+        tag_post_ids = tag.posts.order_by('-published_at', '-id').values_list('id', flat=True)[:TAG_POSTS_PER_PAGE + 1]
+        fingerprints[reverse('tag_filter', args=[tag.title])] = get_fingerprint(
+            common, tag.posts_count, [card_fingerprints[post_id] for post_id in tag_post_ids],
+        )
+    return fingerprints
+
+
+def get_page_path(output_dir, url):
+    # /post/slug превращается в post/slug/index.html: так страницу найдёт любой файловый сервер
+    return os.path.join(output_dir, url.strip('/'), 'index.html')
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(content)
+    os.replace(temporary_path, path)
+
+
+def render_pages(output_dir, urls):
+    rendered = []
+    failed = []
+    # кэш страниц не нужен: каждая страница отрисовывается один раз
+    with override_settings(ALLOWED_HOSTS=['*'], PAGE_CACHE_TIMEOUT=0):
+        # адрес не из INTERNAL_IPS, чтобы Debug Toolbar не попал в страницы
+        client = Client(REMOTE_ADDR='192.0.2.1', raise_request_exception=False)
+        for url in urls:
+            response = client.get(url)
+            if response.status_code != 200:
+                failed.append((url, response.status_code))
+                continue
+            write_file(get_page_path(output_dir, url), response.content)
+            rendered.append(url)
+    return rendered, failed
+
+
+def remove_page(output_dir, url):
+    path = get_page_path(output_dir, url)
+    if os.path.exists(path):
+        os.remove(path)
+    directory = os.path.dirname(path)
+    while directory != os.path.normpath(output_dir) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+def read_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_manifest(output_dir, manifest):
+    write_file(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, ensure_ascii=False).encode())
+
+
+class Command(BaseCommand):
+    help = 'Сохраняет страницы блога в HTML-файлы, которые может раздавать любой файловый сервер'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Папка, куда сохранить страницы')
+        parser.add_argument('--force', action='store_true', help='Перерисовать все страницы, а не только изменённые')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Сколько процессов рисуют страницы')
+        parser.add_argument('--batch-size', type=int, default=200, help='Сколько страниц отдавать процессу за раз')
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir']
+        batch_size = options['batch_size']
+        started_at = time.monotonic()
+
+        manifest = read_manifest(output_dir)
+        fingerprints = get_page_fingerprints(batch_size)
+        stale_urls = [
+            url for url, fingerprint in fingerprints.items()
+            if options['force'] or manifest.get(url) != fingerprint
+            or not os.path.exists(get_page_path(output_dir, url))
+        ]
+        removed_urls = [url for url in manifest if url not in fingerprints]
+        for url in removed_urls:
+            remove_page(output_dir, url)
+            del manifest[url]
+        self.stdout.write(
+            f'Страниц: {len(fingerprints)}, изменились: {len(stale_urls)}, удалены: {len(removed_urls)}'
+        )
+
+        rendered_count = 0
+        failed = []
+        # процессы создаются через fork и не должны унаследовать открытое соединение с базой
+        connections.close_all()
+        try:
+            with ProcessPoolExecutor(max_workers=max(options['workers'], 1), initializer=django.setup) as executor:
+                futures = [
+                    executor.submit(render_pages, output_dir, batch)
+                    for batch in iterate_batches(stale_urls, batch_size)
+                ]
+                for future in as_completed(futures):
+                    rendered, batch_failed = future.result()
+                    for url in rendered:
+                        manifest[url] = fingerprints[url]
+                    rendered_count += len(rendered)
+                    failed.extend(batch_failed)
+                    elapsed = time.monotonic() - started_at
+                    self.stdout.write(
+                        f'Отрисовано страниц: {rendered_count} из {len(stale_urls)}, '
+                        f'{rendered_count / elapsed:.1f} страниц в секунду'
+                    )
+        finally:
+            # если экспорт прервали, готовые страницы не придётся рисовать заново
+            write_manifest(output_dir, manifest)
+
+        for url, status_code in failed:
+            self.stderr.write(f'{url} ответил {status_code}')
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(f'Готово, отрисовано страниц: {rendered_count} за {elapsed:.1f} с'))
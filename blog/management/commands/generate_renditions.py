@@ -0,0 +1,96 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.models import Post
+from blog.page_cache import ALL_PAGES, invalidate_pages
+from blog.renditions import make_renditions, needs_renditions
+from blog.sidebar import invalidate_sidebar
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint_file:
+        content = checkpoint_file.read().strip()
+    try:
+        return int(content)
+    except ValueError:
+        raise CommandError(f'В файле {path} должен быть id поста, а не «{content}»')
+
+
+def write_checkpoint(path, last_id):
+    # пишем во временный файл и подменяем, чтобы при падении не остался обрезанный id
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as checkpoint_file:
+        checkpoint_file.write(str(last_id))
+    os.replace(temporary_path, path)
+
+
+def iterate_batches(posts, batch_size):
+    posts = iter(posts)
+    while batch := list(islice(posts, batch_size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии картинок постов в нескольких процессах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать копии, даже если они уже есть')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Сколько процессов нарезают картинки')
+        parser.add_argument('--batch-size', type=int, default=200, help='Сколько постов сохранять за раз')
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл, в котором хранится id последнего обработанного поста. '
+                 'Если файл есть, обработка продолжится с места остановки',
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        last_id = read_checkpoint(checkpoint)
+        if last_id:
+            self.stdout.write(f'Продолжаем после поста с id {last_id}')
+
+        posts = Post.objects.exclude(image='').filter(id__gt=last_id).only('id', 'image', 'renditions').order_by('id')
+        total = posts.count()
+        batch_size = options['batch_size']
+        scanned = 0
+        processed = 0
+        failed = 0
+        started_at = time.monotonic()
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1), initializer=django.setup) as executor:
+            for scanned_batch in iterate_batches(posts.iterator(chunk_size=batch_size), batch_size):
+                scanned += len(scanned_batch)
+                batch = [post for post in scanned_batch if options['force'] or needs_renditions(post)]
+                image_names = [post.image.name for post in batch]
+                done = []
+                for post, renditions in zip(batch, executor.map(make_renditions, image_names)):
+                    if renditions is not None:
+                        post.renditions = renditions
+                        done.append(post)
+                Post.objects.bulk_update(done, ['renditions'])
+                processed += len(done)
+                failed += len(batch) - len(done)
+
+                if checkpoint:
+                    write_checkpoint(checkpoint, scanned_batch[-1].id)
+                elapsed = time.monotonic() - started_at
+                self.stdout.write(
+                    f'Просмотрено постов: {scanned} из {total}, обработано картинок: {processed}, '
+                    f'{processed / elapsed:.1f} картинок в секунду'
+                )
+
+        if processed:
+            invalidate_sidebar()
+            invalidate_pages(ALL_PAGES)
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.monotonic() - started_at
+        if failed:
+            self.stderr.write(f'Не удалось открыть картинок: {failed}, они будут обработаны при следующем запуске')
+        self.stdout.write(self.style.SUCCESS(f'Готово, обработано картинок: {processed} за {elapsed:.1f} с'))
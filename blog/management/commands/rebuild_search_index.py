@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.models import Post
+from blog.search import index_posts_range, is_search_supported, unindex_deleted_posts
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов и комментариев пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not is_search_supported():
+            raise CommandError('Полнотекстовый поиск работает только с SQLite')
+
+        batch_size = options['batch_size']
+        last_id = 0
+        indexed = 0
+        while True:
+            batch_ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch_ids:
+                break
+            with transaction.atomic():
+                index_posts_range(batch_ids[0], batch_ids[-1])
+            indexed += len(batch_ids)
+            last_id = batch_ids[-1]
+            self.stdout.write(f'Проиндексировано постов: {indexed}')
+        unindex_deleted_posts()
+        self.stdout.write(self.style.SUCCESS(f'Готово, проиндексировано постов: {indexed}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post, Tag
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики лайков, комментариев и постов с тегом'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts_updated = Post.objects.update_likes_count()
+            Post.objects.update_comments_count()
+            tags_updated = Tag.objects.update_posts_count()
+        self.stdout.write(f'Пересчитано постов: {posts_updated}, тегов: {tags_updated}')
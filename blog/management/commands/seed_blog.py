@@ -0,0 +1,126 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.models import TEASER_LENGTH, Comment, Post, Tag
+from blog.page_cache import ALL_PAGES, invalidate_pages
+from blog.search import index_posts_range
+from blog.sidebar import invalidate_sidebar
+
+
+WORDS = (
+    'бизнес успех деньги семья дети совет жизнь время работа проект команда клиент рынок идея цель '
+    'развитие опыт история решение вопрос результат стратегия продажи инвестиции здоровье отдых книга'
+).split()
+
+
+def make_text(words_count):
+    return ' '.join(random.choices(WORDS, k=words_count)).capitalize() + '.'
+
+
+def get_popularity_weights(count):
+    # у живого блога внимание распределено неравномерно: немногие посты собирают большую часть лайков
+    return [random.paretovariate(1.2) for _ in range(count)]
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу синтетическими пользователями, постами, тегами, комментариями и лайками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-post', type=int, default=3)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--likes', type=int, default=20000)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--random-seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        random.seed(options['random_seed'])
+        self.batch_size = options['batch_size']
+        run_id = uuid.uuid4().hex[:6]
+
+        with transaction.atomic():
+            users = self.create_users(run_id, options['users'])
+            tags = self.create_tags(run_id, options['tags'])
+            posts = self.create_posts(run_id, options['posts'], users)
+            self.create_post_tags(posts, tags, options['tags_per_post'])
+            weights = get_popularity_weights(len(posts))
+            self.create_comments(posts, weights, users, options['comments'])
+            self.create_likes(posts, weights, users, options['likes'])
+
+            Post.objects.update_likes_count()
+            Post.objects.update_comments_count()
+            Tag.objects.update_posts_count()
+            if posts:
+                index_posts_range(posts[0].id, posts[-1].id)
+            invalidate_sidebar()
+        invalidate_pages(ALL_PAGES)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, тегов {len(tags)}, постов {len(posts)}'
+        ))
+
+    def create_users(self, run_id, count):
+        users = [
+            User(username=f'seed-{run_id}-{number}', password='!', is_staff=True)
+            for number in range(count)
+        ]
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_tags(self, run_id, count):
+        tags = [Tag(title=f'{run_id}-{number}') for number in range(count)]
+        return Tag.objects.bulk_create(tags, batch_size=self.batch_size)
+
+    def create_posts(self, run_id, count, users):
+        now = timezone.now()
+        texts = [make_text(random.randint(50, 1500)) for _ in range(count)]
+        posts = [
+            Post(
+                title=make_text(6),
+                text=text,
+                teaser=text[:TEASER_LENGTH],
+                slug=f'seed-{run_id}-{number}',
+                image='',
+                published_at=now - timedelta(minutes=random.randint(0, 60 * 24 * 365 * 3)),
+                author=random.choice(users),
+            )
+            for number, text in enumerate(texts)
+        ]
+        return Post.objects.bulk_create(posts, batch_size=self.batch_size)
+
+    def create_post_tags(self, posts, tags, tags_per_post):
+        PostTag = Post.tags.through
+        post_tags = [
+            PostTag(post_id=post.pk, tag_id=tag.pk)
+            for post in posts
+            for tag in random.sample(tags, min(tags_per_post, len(tags)))
+        ]
+        PostTag.objects.bulk_create(post_tags, batch_size=self.batch_size)
+
+    def create_comments(self, posts, weights, users, count):
+        now = timezone.now()
+        comments = []
+        for post in random.choices(posts, weights, k=count):
+            comments.append(Comment(
+                post=post,
+                author=random.choice(users),
+                text=make_text(random.randint(5, 60)),
+                published_at=post.published_at + (now - post.published_at) * random.random(),
+            ))
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+
+    def create_likes(self, posts, weights, users, count):
+        PostLike = Post.likes.through
+        pairs = {
+            (post.pk, random.choice(users).pk)
+            for post in random.choices(posts, weights, k=count)
+        }
+        likes = [PostLike(post_id=post_id, user_id=user_id) for post_id, user_id in pairs]
+        PostLike.objects.bulk_create(likes, batch_size=self.batch_size, ignore_conflicts=True)
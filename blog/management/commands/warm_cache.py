@@ -0,0 +1,132 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import unquote_to_bytes
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+
+from blog.models import Post, Tag
+from blog.page_cache import get_page_key, is_page_fresh
+from blog.pagination import KeysetPaginator
+from blog.sidebar import refresh_sidebar
+from blog.views import POSTS_PER_PAGE, get_page_url
+
+
+# Прогрев при запуске сервера берёт этот ключ в общем кэше, чтобы базу нагружал только один воркер
+STARTUP_LOCK_KEY = 'warm-cache:startup'
+STARTUP_LOCK_TIMEOUT = 10 * 60
+
+
+def get_default_host():
+    # ключ кэша страницы содержит адрес сайта, поэтому прогревать нужно под тем же именем, что у посетителей
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def get_index_urls(index_pages):
+    # посетители переходят по страницам главной со ссылками вида /page/2?after=<курсор>,
+    # поэтому прогреваем именно эти адреса и идём по тем же курсорам, что и кнопка «дальше»
+    paginator = KeysetPaginator(Post.objects.only('published_at'), POSTS_PER_PAGE)
+    urls = [reverse('index')]
+    cursor = None
+    for page_number in range(2, index_pages + 1):
+        page = paginator.get_page(after=cursor)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+        urls.append(get_page_url(page_number, 'after', cursor))
+    return urls
+
+
+def get_hot_urls(posts_count, tags_count, index_pages):
+    urls = get_index_urls(index_pages)
+    urls.extend(
+        reverse('post_detail', args=[slug])
+        for slug in Post.objects.popular().values_list('slug', flat=True)[:posts_count]
+    )
+    urls.extend(
+        reverse('tag_filter', args=[title])
+        for title in Tag.objects.popular().values_list('title', flat=True)[:tags_count]
+    )
+    urls.append(reverse('contacts'))
+    return urls
+
+
+def make_environ(url, host, secure):
+    path, _, query_string = url.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': unquote_to_bytes(path).decode('iso-8859-1'),
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '443' if secure else '80',
+        'HTTP_HOST': host,
+        # адрес не из INTERNAL_IPS, чтобы Debug Toolbar не попал в кэш
+        'REMOTE_ADDR': '192.0.2.1',
+        'wsgi.url_scheme': 'https' if secure else 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+
+
+def warm_page(handler, url, host, secure):
+    try:
+        page = cache.get(get_page_key(WSGIRequest(make_environ(url, host, secure))))
+        if page is not None and is_page_fresh(page):
+            return url, None
+        # страницу собирает тот же обработчик, что и запросы посетителей, со всеми middleware
+        response = handler(make_environ(url, host, secure), lambda status, headers: None)
+        response.close()
+        return url, response.status_code
+    finally:
+        # у каждого потока пула своё соединение с базой
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Заполняет кэш популярными страницами, чтобы после выкладки их не ждали первые посетители'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50, help='Сколько самых популярных постов прогреть')
+        parser.add_argument('--tags', type=int, default=20, help='Сколько самых популярных тегов прогреть')
+        parser.add_argument('--index-pages', type=int, default=3, help='Сколько страниц главной прогреть')
+        parser.add_argument('--threads', type=int, default=4, help='Сколько страниц запрашивать одновременно')
+        parser.add_argument('--host', default=get_default_host(), help='Адрес сайта, под которым заходят посетители')
+        parser.add_argument('--https', action='store_true', help='Посетители заходят на сайт по HTTPS')
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+        refresh_sidebar()
+        urls = get_hot_urls(options['posts'], options['tags'], max(options['index_pages'], 1))
+        handler = WSGIHandler()
+
+        filled = 0
+        already_cached = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(options['threads'], 1)) as executor:
+            results = executor.map(lambda url: warm_page(handler, url, options['host'], options['https']), urls)
+            for url, status_code in results:
+                if status_code is None:
+                    already_cached += 1
+                elif status_code == 200:
+                    filled += 1
+                else:
+                    failed.append(f'{url} ответил {status_code}')
+
+        for error in failed:
+            self.stderr.write(error)
+        if not settings.PAGE_CACHE_TIMEOUT:
+            self.stdout.write('Кэш страниц выключен, страницы только прочитали базу в память')
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето за {elapsed:.1f} с: боковая колонка и {filled} страниц, '
+            f'уже были в кэше {already_cached}, с ошибкой {len(failed)}'
+        ))
@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates, Template
+
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы времени ответа, в секундах
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+current_request_metrics = ContextVar('current_request_metrics', default=None)
+
+
+@dataclass
+class RequestMetrics:
+    queries_count: int = 0
+    sql_duration: float = 0
+    render_duration: float = 0
+    render_depth: int = 0
+
+
+@dataclass
+class ViewMetrics:
+    requests_count: int = 0
+    duration: float = 0
+    queries_count: int = 0
+    sql_duration: float = 0
+    render_duration: float = 0
+    response_size: int = 0
+    duration_buckets: list = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view_name, duration, request_metrics, response_size):
+        with self._lock:
+            view_metrics = self._views.setdefault(view_name, ViewMetrics())
+            view_metrics.requests_count += 1
+            view_metrics.duration += duration
+            view_metrics.queries_count += request_metrics.queries_count
+            view_metrics.sql_duration += request_metrics.sql_duration
+            view_metrics.render_duration += request_metrics.render_duration
+            view_metrics.response_size += response_size
+            bucket = bisect_left(DURATION_BUCKETS, duration)
+            if bucket < len(DURATION_BUCKETS):
+                view_metrics.duration_buckets[bucket] += 1
+
+    def render_prometheus(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                '# HELP blog_request_duration_seconds Время ответа страницы',
+                '# TYPE blog_request_duration_seconds histogram',
+            ]
+            for view_name, view_metrics in views:
+                cumulative_count = 0
+                for upper_bound, bucket_count in zip(DURATION_BUCKETS, view_metrics.duration_buckets):
+                    cumulative_count += bucket_count
+                    lines.append(
+                        f'blog_request_duration_seconds_bucket{{view="{view_name}",le="{upper_bound}"}} '
+                        f'{cumulative_count}'
+                    )
+                lines.append(
+                    f'blog_request_duration_seconds_bucket{{view="{view_name}",le="+Inf"}} '
+                    f'{view_metrics.requests_count}'
+                )
+                lines.append(f'blog_request_duration_seconds_sum{{view="{view_name}"}} {view_metrics.duration}')
+                lines.append(f'blog_request_duration_seconds_count{{view="{view_name}"}} {view_metrics.requests_count}')
+
+            counters = [
+                ('blog_sql_queries_total', 'Число SQL-запросов', 'queries_count'),
+                ('blog_sql_duration_seconds_total', 'Время SQL-запросов', 'sql_duration'),
+                ('blog_template_render_seconds_total', 'Время отрисовки шаблонов', 'render_duration'),
+                ('blog_response_bytes_total', 'Размер ответов', 'response_size'),
+            ]
+            for metric_name, description, attribute in counters:
+                lines.append(f'# HELP {metric_name} {description}')
+                lines.append(f'# TYPE {metric_name} counter')
+                for view_name, view_metrics in views:
+                    lines.append(f'{metric_name}{{view="{view_name}"}} {getattr(view_metrics, attribute)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def count_query(execute, sql, params, many, context):
+    request_metrics = current_request_metrics.get()
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if request_metrics is not None:
+            request_metrics.queries_count += 1
+            request_metrics.sql_duration += time.perf_counter() - started_at
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        request_metrics = current_request_metrics.get()
+        if request_metrics is None:
+            return super().render(context, request)
+
+        # вложенные шаблоны уже учтены во времени внешнего
+        request_metrics.render_depth += 1
+        started_at = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.render_depth -= 1
+            if not request_metrics.render_depth:
+                request_metrics.render_duration += time.perf_counter() - started_at
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class PerformanceMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = RequestMetrics()
+        token = current_request_metrics.set(request_metrics)
+        started_at = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_query):
+                response = self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+        duration = time.perf_counter() - started_at
+
+        resolver_match = request.resolver_match
+        view_name = resolver_match.view_name if resolver_match else 'unresolved'
+        response_size = 0 if response.streaming else len(response.content)
+        registry.record(view_name, duration, request_metrics, response_size)
+
+        # устройство сайта и нагрузку на базу показываем только тем же адресам, что видят /metrics
+        if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+            response['Server-Timing'] = ', '.join([
+                f'total;dur={duration * 1000:.1f}',
+                f'sql;dur={request_metrics.sql_duration * 1000:.1f};desc="{request_metrics.queries_count} queries"',
+                f'render;dur={request_metrics.render_duration * 1000:.1f}',
+            ])
+        logger.info(
+            '%s %s %s %.1fms sql=%d/%.1fms render=%.1fms size=%d',
+            view_name,
+            request.method,
+            response.status_code,
+            duration * 1000,
+            request_metrics.queries_count,
+            request_metrics.sql_duration * 1000,
+            request_metrics.render_duration * 1000,
+            response_size,
+        )
+        return response
+
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(Subquery(counts.annotate(count=Count('*')).values('count')), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Tag = apps.get_model('blog', 'Tag')
+    Comment = apps.get_model('blog', 'Comment')
+    Post.objects.update(
+        likes_count=count_subquery(Post.likes.through.objects, 'post_id'),
+        comments_count=count_subquery(Comment.objects, 'post_id'),
+    )
+    Tag.objects.update(posts_count=count_subquery(Post.tags.through.objects, 'tag_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_alter_comment_id_alter_post_id_alter_tag_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество лайков'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='posts_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
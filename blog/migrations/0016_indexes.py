@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def make_slugs_unique(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    duplicated_slugs = Post.objects.values('slug').annotate(count=Count('id')).filter(count__gt=1) \
+        .values_list('slug', flat=True)
+    for post in Post.objects.filter(slug__in=list(duplicated_slugs)).order_by('slug', 'id'):
+        if Post.objects.filter(slug=post.slug, id__lt=post.id).exists():
+            post.slug = f'{post.slug[:180]}-{post.id}'
+            post.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_slugs_unique, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='post',
+            name='slug',
+            field=models.SlugField(max_length=200, unique=True, verbose_name='Название в виде url'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'published_at', 'id'], name='comment_post_published_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['published_at', 'id'], name='post_published_at_idx'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX post_likes_user_post_idx ON blog_post_likes (user_id, post_id)',
+            'DROP INDEX post_likes_user_post_idx',
+        ),
+    ]
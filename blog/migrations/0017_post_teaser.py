@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:38
+
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+
+def fill_teasers(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.update(teaser=Substr('text', 1, 200))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='teaser',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Анонс'),
+        ),
+        migrations.RunPython(fill_teasers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # Полнотекстовый поиск пока есть только для SQLite: таблица FTS5 хранит заголовок,
+    # текст поста и все его комментарии одной строкой с rowid, равным id поста
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE blog_post_search USING fts5("
+        "title, text, comments, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO blog_post_search (rowid, title, text, comments) "
+        "SELECT post.id, post.title, post.text, ("
+        "SELECT group_concat(comment.text, ' ') FROM blog_comment AS comment WHERE comment.post_id = post.id"
+        ") FROM blog_post AS post"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS blog_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_post_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
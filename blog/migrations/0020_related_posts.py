@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0019_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место в списке похожих')),
+                ('score', models.FloatField(verbose_name='Похожесть по тегам')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.post', verbose_name='Пост')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_to_links', to='blog.post', verbose_name='Похожий пост')),
+            ],
+            options={
+                'verbose_name': 'похожий пост',
+                'verbose_name_plural': 'похожие посты',
+                'ordering': ['post', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedpost',
+            constraint=models.UniqueConstraint(fields=('post', 'rank'), name='related_post_rank_unique'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_related_posts'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX post_tags_tag_post_idx ON blog_post_tags (tag_id, post_id)',
+            'DROP INDEX post_tags_tag_post_idx',
+        ),
+    ]
@@ -1,53 +1,66 @@
 from django.db import models
 from django.urls import reverse
 from django.contrib.auth.models import User
-from django.db.models import Count, Prefetch
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce, Substr
+
+
+TEASER_LENGTH = 200
+
+
+def count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(Subquery(counts.annotate(count=Count('*')).values('count')), 0)
 
 
 class TagQuerySet(models.QuerySet):
 
     def popular(self):
-        return self.annotate(posts_count=Count('posts')).order_by('-posts_count')
+        return self.order_by('-posts_count')
+
+    def update_posts_count(self):
+        return self.update(posts_count=count_subquery(Post.tags.through.objects, 'tag_id'))
 
 
 class PostQuerySet(models.QuerySet):
 
     def popular(self):
-        return self.annotate(Count('likes')).order_by('-likes__count')
+        return self.order_by('-likes_count')
 
-    def prefetch_with_related_tags(self):
-        popular_tags = Tag.objects.popular()
-        prefetch = Prefetch('tags', queryset=popular_tags, to_attr='related_tags')
-        return self.prefetch_related(prefetch)
+    def update_likes_count(self):
+        return self.update(likes_count=count_subquery(Post.likes.through.objects, 'post_id'))
 
-    def prefetch_with_related_comments(self):
-        popular_tags = Tag.objects.popular()
-        prefetch = Prefetch('comments', queryset=popular_tags, to_attr='comments')
-        return self.prefetch_related(prefetch)
+    def update_comments_count(self):
+        return self.update(comments_count=count_subquery(Comment.objects, 'post_id'))
 
-    def prefetch_with_related_author(self):
+    def update_teaser(self):
+        return self.update(teaser=Substr('text', 1, TEASER_LENGTH))
+
+    def without_text(self):
+        return self.defer('text')
+
+    def prefetch_with_related_tags(self):
         popular_tags = Tag.objects.popular()
-        prefetch = Prefetch('author', queryset=popular_tags, to_attr='author_name')
+        prefetch = Prefetch('tags', queryset=popular_tags, to_attr='related_tags')
         return self.prefetch_related(prefetch)
 
-    def fetch_with_comments_count(self):
-        most_popular_posts_ids = self.values_list('id', flat=True)
-        comments_count = Comment.objects.filter(post_id__in=most_popular_posts_ids).values('post_id').annotate(
-            comments_count=Count('id'))
-        count_for_id = {comment['post_id']: comment['comments_count'] for comment in comments_count}
-
-        for post in self:
-            post.comments_count = count_for_id.get(post.id, 0)
+    def fetch_with_author(self):
+        return self.select_related('author')
 
-        return list(self)
+    def related_to(self, post):
+        return self.filter(related_to_links__post=post).order_by('related_to_links__rank')
 
 
 class Post(models.Model):
     title = models.CharField('Заголовок', max_length=200)
     text = models.TextField('Текст')
-    slug = models.SlugField('Название в виде url', max_length=200)
+    teaser = models.CharField('Анонс', max_length=TEASER_LENGTH, blank=True, editable=False)
+    slug = models.SlugField('Название в виде url', max_length=200, unique=True)
     image = models.ImageField('Картинка')
+    renditions = models.JSONField('Уменьшенные копии картинки', default=dict, blank=True, editable=False)
     published_at = models.DateTimeField('Дата и время публикации')
+    likes_count = models.PositiveIntegerField('Количество лайков', default=0, db_index=True, editable=False)
+    comments_count = models.PositiveIntegerField('Количество комментариев', default=0, editable=False)
 
     author = models.ForeignKey(
         User,
@@ -68,18 +81,29 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-published_at']
+        indexes = [
+            models.Index(fields=['published_at', 'id'], name='post_published_at_idx'),
+        ]
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, update_fields=None, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.teaser = self.text[:TEASER_LENGTH]
+            if update_fields is not None and 'text' in update_fields:
+                update_fields = {*update_fields, 'teaser'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
     def get_absolute_url(self):
         return reverse('post_detail', args={'slug': self.slug})
 
 
 class Tag(models.Model):
     title = models.CharField('Тег', max_length=20, unique=True)
+    posts_count = models.PositiveIntegerField('Количество постов', default=0, db_index=True, editable=False)
 
     objects = TagQuerySet.as_manager()
 
@@ -114,8 +138,37 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['published_at']
+        indexes = [
+            models.Index(fields=['post', 'published_at', 'id'], name='comment_post_published_at_idx'),
+        ]
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
 
     def __str__(self):
         return f'{self.author.username} under {self.post.title}'
+
+
+class RelatedPost(models.Model):
+    post = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name='Пост')
+    related = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='related_to_links',
+        verbose_name='Похожий пост')
+    rank = models.PositiveSmallIntegerField('Место в списке похожих')
+    score = models.FloatField('Похожесть по тегам')
+
+    class Meta:
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='related_post_rank_unique'),
+        ]
+        verbose_name = 'похожий пост'
+        verbose_name_plural = 'похожие посты'
+
+    def __str__(self):
+        return f'{self.related.title} is similar to {self.post.title}'
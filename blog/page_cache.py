@@ -0,0 +1,103 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+ALL_PAGES = 'pages'
+INDEX = 'index'
+SIDEBAR = 'sidebar'
+# RSS, Atom и карта сайта: меняются, только когда публикуют, правят или удаляют посты
+FEEDS = 'feeds'
+
+
+def post_dependency(post_id):
+    return f'post:{post_id}'
+
+
+def tag_dependency(tag_id):
+    return f'tag:{tag_id}'
+
+
+def tag_posts_dependency(tag_id):
+    return f'tag-posts:{tag_id}'
+
+
+def get_dependency_key(dependency):
+    return f'page-dependency:{dependency}'
+
+
+def get_page_key(request):
+    url = request.build_absolute_uri()
+    return f'page:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+def invalidate_pages(*dependencies):
+    # Храним время сброса, а не удаляем ключ: иначе страница, которая рисовалась во время записи,
+    # получила бы новую версию зависимости и попала бы в кэш со старыми данными
+    invalidated_at = time.time()
+    cache.set_many(
+        {get_dependency_key(dependency): invalidated_at for dependency in dependencies},
+        timeout=None,
+    )
+
+
+def is_page_fresh(page):
+    invalidated_at = cache.get_many(page['dependencies'])
+    # если время сброса вытеснено из кэша, неизвестно, когда он был, и страницу лучше перерисовать
+    return len(invalidated_at) == len(page['dependencies']) \
+        and all(timestamp < page['built_at'] for timestamp in invalidated_at.values())
+
+
+def make_page(response, built_at):
+    dependencies = [get_dependency_key(dependency)
+                    for dependency in {ALL_PAGES, *getattr(response, 'page_dependencies', [])}]
+    # зависимости, которые ещё ни разу не сбрасывались, считаем сброшенными в начале времён
+    for key in dependencies:
+        cache.add(key, 0, timeout=None)
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+        'last_modified': int(time.time()),
+        'built_at': built_at,
+        'dependencies': dependencies,
+    }
+
+
+def make_response(request, page):
+    response = HttpResponse(page['content'], content_type=page['content_type'])
+    response['ETag'] = page['etag']
+    response['Last-Modified'] = http_date(page['last_modified'])
+    return get_conditional_response(
+        request,
+        etag=page['etag'],
+        last_modified=page['last_modified'],
+        response=response,
+    )
+
+
+def cache_page_for_anonymous(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not settings.PAGE_CACHE_TIMEOUT or request.method not in ('GET', 'HEAD') \
+                or request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        page_key = get_page_key(request)
+        page = cache.get(page_key)
+        if page is None or not is_page_fresh(page):
+            # время берём до отрисовки: сброс, случившийся во время неё, сделает страницу устаревшей
+            built_at = time.time()
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            page = make_page(response, built_at)
+            cache.set(page_key, page, settings.PAGE_CACHE_TIMEOUT)
+        return make_response(request, page)
+    return wrapper
@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+
+# Таблицы меньше этого размера считаются точно: COUNT(*) по ним и так быстрый
+EXACT_COUNT_LIMIT = 10000
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(obj):
+    key = json.dumps([obj.published_at.isoformat(), obj.id])
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded_cursor = cursor + '=' * (-len(cursor) % 4)
+        published_at, obj_id = json.loads(base64.urlsafe_b64decode(padded_cursor))
+        return datetime.fromisoformat(published_at), int(obj_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Некорректный курсор страницы')
+
+
+class KeysetPage:
+
+    def __init__(self, items, has_next, has_previous):
+        self.items = items
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.items[-1]) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.items[0]) if self.has_previous else None
+
+
+class KeysetPaginator:
+
+    def __init__(self, queryset, per_page, descending=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.descending = descending
+
+    def get_page(self, after=None, before=None, offset=0):
+        if before:
+            return self._get_page_before(decode_cursor(before))
+
+        queryset = self._order(self.queryset, self.descending)
+        if after:
+            queryset = queryset.filter(self._beyond(decode_cursor(after), self.descending))
+            offset = 0
+        items = list(queryset[offset:offset + self.per_page + 1])
+        return KeysetPage(
+            items[:self.per_page],
+            has_next=len(items) > self.per_page,
+            has_previous=bool(after) or offset > 0,
+        )
+
+    def _get_page_before(self, key):
+        queryset = self._order(self.queryset, not self.descending)
+        queryset = queryset.filter(self._beyond(key, not self.descending))
+        items = list(queryset[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        return KeysetPage(items[:self.per_page][::-1], has_next=True, has_previous=has_previous)
+
+    @staticmethod
+    def _order(queryset, descending):
+        if descending:
+            return queryset.order_by('-published_at', '-id')
+        return queryset.order_by('published_at', 'id')
+
+    @staticmethod
+    def _beyond(key, descending):
+        published_at, obj_id = key
+        lookup = 'lt' if descending else 'gt'
+        return Q(**{f'published_at__{lookup}': published_at}) | Q(published_at=published_at, **{f'id__{lookup}': obj_id})
+
+
+class EstimatedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return super().count
+        # Без фильтров число строк оцениваем по наибольшему id — это один шаг по индексу первичного ключа.
+        # Удалённые строки завышают оценку, и последние страницы могут оказаться пустыми
+        estimated_count = queryset.aggregate(max_id=Max('pk'))['max_id'] or 0
+        if estimated_count < EXACT_COUNT_LIMIT:
+            return super().count
+        return estimated_count
@@ -0,0 +1,88 @@
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+WHITESPACE_RE = re.compile(r'\s+')
+# Транзакции и точки сохранения повторяются законно, например в каждом atomic()
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+class RepeatedQueriesError(Exception):
+    pass
+
+
+def get_query_shape(sql):
+    # Запросы одной формы отличаются только значениями: id поста, числом элементов в IN (...) и т. п.
+    shape = STRING_LITERAL_RE.sub('?', sql)
+    shape = NUMBER_RE.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = PLACEHOLDER_LIST_RE.sub('(...)', shape)
+    return WHITESPACE_RE.sub(' ', shape).strip()
+
+
+def get_project_stack():
+    # Оставляем только кадры из кода проекта: по ним видно, какая строка вызвала запрос
+    project_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(project_dir) and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+class QueryShapeDetector:
+    def __init__(self, threshold, raise_errors=False):
+        self.threshold = threshold
+        self.raise_errors = raise_errors
+        self.shapes = Counter()
+        self.reports = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+            shape = get_query_shape(sql)
+            self.shapes[shape] += 1
+            if self.shapes[shape] == self.threshold + 1:
+                self.report(shape)
+        return execute(sql, params, many, context)
+
+    def report(self, shape):
+        message = (
+            f'Запрос одной и той же формы выполнен больше {self.threshold} раз — похоже на N+1:\n'
+            f'{shape}\nВызван из:\n{get_project_stack()}'
+        )
+        self.reports.append(message)
+        if self.raise_errors:
+            raise RepeatedQueriesError(message)
+        logger.warning(message)
+
+
+@contextmanager
+def detect_repeated_queries(threshold=None, raise_errors=None):
+    if threshold is None:
+        threshold = settings.REPEATED_QUERIES_THRESHOLD
+    if raise_errors is None:
+        raise_errors = settings.REPEATED_QUERIES_RAISE
+    detector = QueryShapeDetector(threshold, raise_errors)
+    with connection.execute_wrapper(detector):
+        yield detector
+
+
+class RepeatedQueriesMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect_repeated_queries():
+            return self.get_response(request)
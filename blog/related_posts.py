@@ -0,0 +1,55 @@
+import heapq
+from collections import defaultdict
+from itertools import combinations
+
+
+RELATED_POSTS_COUNT = 5
+
+
+def get_jaccard_similarity(tags, other_tags):
+    return len(tags & other_tags) / len(tags | other_tags)
+
+
+def find_related_posts(post_tags, post_positions, count=RELATED_POSTS_COUNT):
+    # post_tags — {id поста: множество id его тегов},
+    # post_positions — {id поста: место в ленте}, из двух одинаково похожих постов выше встанет более свежий.
+    # Сравнивать каждый пост со всеми, у кого есть общий тег, слишком долго: у популярных тегов тысячи постов.
+    # Поэтому посты, у которых с данным не меньше двух общих тегов, ищем по индексу пар тегов, а похожесть
+    # остальных зависит только от числа их тегов — из каждого тега хватит первых count постов с самыми короткими
+    # списками тегов.
+    tag_posts = defaultdict(list)
+    tag_pair_posts = defaultdict(list)
+    for post_id, tags in post_tags.items():
+        for tag_id in tags:
+            tag_posts[tag_id].append(post_id)
+        for tag_pair in combinations(sorted(tags), 2):
+            tag_pair_posts[tag_pair].append(post_id)
+    for posts in tag_posts.values():
+        posts.sort(key=lambda post_id: (len(post_tags[post_id]), post_positions[post_id]))
+
+    for post_id, tags in post_tags.items():
+        close_posts = set()
+        for tag_pair in combinations(sorted(tags), 2):
+            close_posts.update(tag_pair_posts[tag_pair])
+        close_posts.discard(post_id)
+        candidates = [
+            (get_jaccard_similarity(tags, post_tags[close_post_id]), close_post_id)
+            for close_post_id in close_posts
+        ]
+
+        for tag_id in tags:
+            found = 0
+            for other_post_id in tag_posts[tag_id]:
+                if found == count:
+                    break
+                if other_post_id == post_id or other_post_id in close_posts:
+                    continue
+                candidates.append((1 / (len(tags) + len(post_tags[other_post_id]) - 1), other_post_id))
+                found += 1
+
+        related_posts = heapq.nsmallest(
+            count,
+            candidates,
+            key=lambda candidate: (-candidate[0], post_positions[candidate[1]]),
+        )
+        yield post_id, [(related_post_id, score) for score, related_post_id in related_posts]
@@ -0,0 +1,87 @@
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+# максимальные ширина и высота уменьшенной копии, пропорции картинки сохраняются
+RENDITION_SIZES = {
+    'card': (750, 500),
+    'slider': (360, 240),
+    'detail': (1140, 760),
+}
+RENDITION_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+}
+RENDITIONS_DIR = 'renditions'
+
+
+def save_image(image, name, image_format):
+    pil_format, extension, save_options = RENDITION_FORMATS[image_format]
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **save_options)
+    name = f'{name}.{extension}'
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def make_renditions(source_name):
+    try:
+        with default_storage.open(source_name) as source_file:
+            source = ImageOps.exif_transpose(Image.open(source_file))
+            source.load()
+    except (OSError, UnidentifiedImageError):
+        # ничего не запоминаем: needs_renditions вернёт True, и при следующем сохранении или запуске команды
+        # картинку попробуют нарезать ещё раз
+        logger.warning('Не удалось открыть картинку %s', source_name, exc_info=True)
+        return None
+
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+
+    # расширение остаётся в имени, иначе копии картинок a.jpg и a.png разных постов затирали бы друг друга
+    name, extension = os.path.splitext(source_name)
+    stem = f'{name}-{extension.lstrip(".")}' if extension else name
+    renditions = {'source': source_name}
+    for kind, size in RENDITION_SIZES.items():
+        image = source.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        renditions[kind] = {
+            'width': image.width,
+            'height': image.height,
+            **{
+                image_format: save_image(image, f'{RENDITIONS_DIR}/{stem}-{kind}', image_format)
+                for image_format in RENDITION_FORMATS
+            },
+        }
+    return renditions
+
+
+def needs_renditions(post):
+    return bool(post.image) and post.renditions.get('source') != post.image.name
+
+
+def serialize_rendition(post, kind):
+    rendition = post.renditions.get(kind) if post.image.name == post.renditions.get('source') else None
+    if not rendition:
+        return {
+            'url': post.image.url if post.image else None,
+            'webp_url': None,
+            'width': None,
+            'height': None,
+        }
+    return {
+        'url': default_storage.url(rendition['jpeg']),
+        'webp_url': default_storage.url(rendition['webp']),
+        'width': rendition['width'],
+        'height': rendition['height'],
+    }
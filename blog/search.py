@@ -0,0 +1,114 @@
+import re
+import threading
+
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+SEARCH_TABLE = 'blog_post_search'
+# Веса колонок title, text, comments при ранжировании: совпадение в заголовке важнее всего
+SEARCH_WEIGHTS = (10.0, 1.0, 0.5)
+SNIPPET_TOKENS = 24
+# Границы совпадений в сниппете. Обычные символы не подходят: текст поста экранируется
+# уже после выборки, и <mark> нельзя подставить в базе
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+# id постов, которые нужно переиндексировать после коммита; соединения с базой у каждого потока свои
+pending_index = threading.local()
+
+INDEX_POSTS_SQL = f'''
+    INSERT INTO {SEARCH_TABLE} (rowid, title, text, comments)
+    SELECT post.id, post.title, post.text, (
+        SELECT group_concat(comment.text, ' ') FROM blog_comment AS comment WHERE comment.post_id = post.id
+    )
+    FROM blog_post AS post
+'''
+
+
+def is_search_supported():
+    return connection.vendor == 'sqlite'
+
+
+def make_match_query(query):
+    # Каждое слово ищем по префиксу, а кавычки не дают пользователю сломать синтаксис FTS5
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_posts(post_ids):
+    if not is_search_supported() or not post_ids:
+        return
+    post_ids = list(post_ids)
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+        cursor.execute(f'{INDEX_POSTS_SQL} WHERE post.id IN ({placeholders})', post_ids)
+
+
+def index_posts_on_commit(post_ids):
+    # Строка поста в индексе собирается из всех его комментариев. Сигналы одной транзакции просят
+    # переиндексировать пост много раз, а пересобрать строку достаточно однажды после коммита
+    if not is_search_supported() or not post_ids:
+        return
+    if not hasattr(pending_index, 'post_ids'):
+        pending_index.post_ids = set()
+    pending_index.post_ids.update(post_ids)
+    # колбэк регистрируем каждый раз: после отката транзакции ранее добавленный пропадает,
+    # а лишние вызовы ничего не делают
+    transaction.on_commit(index_pending_posts)
+
+
+def index_pending_posts():
+    post_ids = pending_index.__dict__.pop('post_ids', set())
+    if post_ids:
+        with transaction.atomic():
+            index_posts(post_ids)
+
+
+def index_posts_range(first_id, last_id):
+    if not is_search_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid BETWEEN %s AND %s', [first_id, last_id])
+        cursor.execute(f'{INDEX_POSTS_SQL} WHERE post.id BETWEEN %s AND %s', [first_id, last_id])
+
+
+def unindex_posts(post_ids):
+    if not is_search_supported() or not post_ids:
+        return
+    post_ids = list(post_ids)
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+
+
+def unindex_deleted_posts():
+    if not is_search_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid NOT IN (SELECT id FROM blog_post)')
+
+
+def search_posts(query, limit, offset=0):
+    match_query = make_match_query(query)
+    if not match_query or not is_search_supported():
+        return []
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, '…', %s)
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH %s
+            ORDER BY bm25({SEARCH_TABLE}, {weights})
+            LIMIT %s OFFSET %s
+            ''',
+            [MATCH_START, MATCH_END, SNIPPET_TOKENS, match_query, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def highlight_snippet(snippet):
+    return mark_safe(escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
@@ -0,0 +1,43 @@
+from blog.renditions import serialize_rendition
+
+
+def serialize_post(post):
+    return {
+        'title': post.title,
+        'teaser_text': post.teaser,
+        'author': post.author.username,
+        'comments_amount': post.comments_count,
+        'image_url': post.image.url if post.image else None,
+        'card_image': serialize_rendition(post, 'card'),
+        'slider_image': serialize_rendition(post, 'slider'),
+        'published_at': post.published_at,
+        'slug': post.slug,
+        'tags': [serialize_tag(tag) for tag in post.related_tags],
+        # пост без тегов бывает сразу после создания, пока теги ещё не добавлены
+        'first_tag_title': post.related_tags[0].title if post.related_tags else None,
+    }
+
+
+def serialize_related_post(post):
+    return {
+        'title': post.title,
+        'author': post.author.username,
+        'published_at': post.published_at,
+        'slug': post.slug,
+        'slider_image': serialize_rendition(post, 'slider'),
+    }
+
+
+def serialize_tag(tag):
+    return {
+        'title': tag.title,
+        'posts_with_tag': tag.posts_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'text': comment.text,
+        'published_at': comment.published_at,
+        'author': comment.author.username,
+    }
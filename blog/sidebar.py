@@ -0,0 +1,73 @@
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from blog.models import Post, Tag
+from blog.page_cache import SIDEBAR, invalidate_pages
+from blog.serializers import serialize_post, serialize_tag
+
+
+logger = logging.getLogger(__name__)
+
+SIDEBAR_KEY = 'sidebar'
+SIDEBAR_FINGERPRINT_KEY = 'sidebar:fingerprint'
+SIDEBAR_SIZE = 5
+
+# пересборка колонки запрошена и ждёт коммита; соединения с базой у каждого потока свои
+pending_refresh = threading.local()
+
+
+def fetch_popular_tags():
+    return [serialize_tag(tag) for tag in Tag.objects.popular()[:SIDEBAR_SIZE]]
+
+
+def fetch_most_popular_posts():
+    most_popular_posts = Post.objects.popular().without_text().prefetch_with_related_tags() \
+        .fetch_with_author()[:SIDEBAR_SIZE]
+    return [serialize_post(post) for post in most_popular_posts]
+
+
+def refresh_sidebar():
+    sidebar = {
+        'popular_tags': fetch_popular_tags(),
+        'most_popular_posts': fetch_most_popular_posts(),
+    }
+    cache.set(SIDEBAR_KEY, sidebar, settings.SIDEBAR_CACHE_TIMEOUT)
+
+    # Кэшированные страницы сбрасываем, только если блоки действительно изменились
+    fingerprint = hashlib.md5(repr(sidebar).encode()).hexdigest()
+    if cache.get(SIDEBAR_FINGERPRINT_KEY) != fingerprint:
+        cache.set(SIDEBAR_FINGERPRINT_KEY, fingerprint, timeout=None)
+        invalidate_pages(SIDEBAR)
+    return sidebar
+
+
+def get_sidebar():
+    sidebar = cache.get(SIDEBAR_KEY)
+    if sidebar is None:
+        sidebar = refresh_sidebar()
+    return sidebar
+
+
+def refresh_sidebar_after_write():
+    if not pending_refresh.__dict__.pop('requested', False):
+        return
+    cache.delete(SIDEBAR_KEY)
+    try:
+        refresh_sidebar()
+    except Exception:
+        # запись уже сохранена, ломать её из-за боковой колонки нельзя: блоки соберёт get_sidebar
+        logger.exception('Не удалось пересобрать боковую колонку')
+        invalidate_pages(SIDEBAR)
+
+
+def invalidate_sidebar():
+    # Сигналы одной транзакции вызывают сброс много раз, а пересобрать колонку достаточно однажды после коммита.
+    # Колбэк регистрируем каждый раз: после отката транзакции ранее добавленный пропадает, а лишние вызовы
+    # ничего не делают
+    pending_refresh.requested = True
+    transaction.on_commit(refresh_sidebar_after_write)
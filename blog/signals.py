@@ -0,0 +1,182 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from blog.models import Comment, Post, Tag
+from blog.page_cache import ALL_PAGES, FEEDS, INDEX, invalidate_pages, post_dependency, tag_dependency, \
+    tag_posts_dependency
+from blog.renditions import make_renditions, needs_renditions
+from blog.search import index_posts_on_commit, unindex_posts
+from blog.sidebar import invalidate_sidebar
+
+
+def purge_pages(*dependencies):
+    transaction.on_commit(partial(invalidate_pages, *dependencies))
+
+
+def purge_post_pages(post_ids):
+    tag_ids = set(Post.tags.through.objects.filter(post_id__in=post_ids).values_list('tag_id', flat=True))
+    purge_pages(
+        INDEX,
+        *[post_dependency(post_id) for post_id in post_ids],
+        *[tag_posts_dependency(tag_id) for tag_id in tag_ids],
+    )
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def update_likes_count(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_ids = set(instance.liked_posts.values_list('id', flat=True))
+        else:
+            instance._cleared_ids = {instance.pk}
+        return
+    if action == 'post_clear':
+        post_ids = instance.__dict__.pop('_cleared_ids', set())
+    elif action in ('post_add', 'post_remove'):
+        post_ids = set(pk_set) if reverse else {instance.pk}
+    else:
+        return
+    Post.objects.filter(pk__in=post_ids).update_likes_count()
+    purge_pages(*[post_dependency(post_id) for post_id in post_ids])
+    invalidate_sidebar()
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_posts_count(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_ids = set(instance.posts.values_list('id', flat=True))
+        else:
+            instance._cleared_ids = set(instance.tags.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        related_ids = instance.__dict__.pop('_cleared_ids', set())
+    elif action in ('post_add', 'post_remove'):
+        related_ids = set(pk_set)
+    else:
+        return
+    post_ids, tag_ids = (related_ids, {instance.pk}) if reverse else ({instance.pk}, related_ids)
+    Tag.objects.filter(pk__in=tag_ids).update_posts_count()
+    purge_pages(
+        INDEX,
+        FEEDS,
+        *[post_dependency(post_id) for post_id in post_ids],
+        *[tag_dependency(tag_id) for tag_id in tag_ids],
+        *[tag_posts_dependency(tag_id) for tag_id in tag_ids],
+    )
+    invalidate_sidebar()
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_post(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._previous_post_id = None
+        return
+    instance._previous_post_id = Comment.objects.filter(pk=instance.pk).values_list('post_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_count_on_save(sender, instance, created, **kwargs):
+    post_ids = {instance.post_id, instance.__dict__.pop('_previous_post_id', None)} - {None}
+    if created or len(post_ids) > 1:
+        Post.objects.filter(pk__in=post_ids).update_comments_count()
+    index_posts_on_commit(post_ids)
+    purge_post_pages(post_ids)
+    invalidate_sidebar()
+
+
+@receiver(post_delete, sender=Comment)
+def update_comments_count_on_delete(sender, instance, origin=None, **kwargs):
+    # комментарии удаляются каскадом вместе с постом: пересчитывать и переиндексировать его незачем,
+    # индекс и страницы поста почистит update_posts_count_on_delete
+    if isinstance(origin, Post) or getattr(origin, 'model', None) is Post:
+        return
+    Post.objects.filter(pk=instance.post_id).update_comments_count()
+    index_posts_on_commit({instance.post_id})
+    purge_post_pages({instance.post_id})
+    invalidate_sidebar()
+
+
+def save_renditions(post_id, image_name):
+    renditions = make_renditions(image_name)
+    if renditions is None:
+        return
+    # пока картинка нарезалась, пост могли пересохранить с другой картинкой
+    if Post.objects.filter(pk=post_id, image=image_name).update(renditions=renditions):
+        purge_post_pages({post_id})
+        invalidate_sidebar()
+
+
+@receiver(post_save, sender=Post)
+def update_renditions(sender, instance, **kwargs):
+    if 'image' in instance.get_deferred_fields() or not needs_renditions(instance):
+        return
+    # нарезка картинки долгая, транзакцию и блокировку записи SQLite на это время не держим
+    transaction.on_commit(partial(save_renditions, instance.pk, instance.image.name))
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'title', 'text'} & set(update_fields):
+        index_posts_on_commit({instance.pk})
+
+
+@receiver(post_save, sender=Post)
+def purge_pages_on_post_save(sender, instance, **kwargs):
+    purge_post_pages({instance.pk})
+    purge_pages(FEEDS)
+    invalidate_sidebar()
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_tags(sender, instance, **kwargs):
+    instance._tag_ids = list(instance.tags.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def update_posts_count_on_delete(sender, instance, **kwargs):
+    tag_ids = instance.__dict__.pop('_tag_ids', [])
+    Tag.objects.filter(pk__in=tag_ids).update_posts_count()
+    unindex_posts({instance.pk})
+    purge_pages(
+        INDEX,
+        FEEDS,
+        post_dependency(instance.pk),
+        *[tag_dependency(tag_id) for tag_id in tag_ids],
+        *[tag_posts_dependency(tag_id) for tag_id in tag_ids],
+    )
+    invalidate_sidebar()
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def purge_pages_on_tag_change(sender, instance, **kwargs):
+    # название тега выводится в списках постов на всех страницах, точечно их не найти
+    purge_pages(ALL_PAGES)
+    invalidate_sidebar()
+
+
+@receiver(pre_delete, sender=User)
+def remember_liked_posts(sender, instance, **kwargs):
+    instance._liked_post_ids = list(instance.liked_posts.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def update_likes_count_on_user_delete(sender, instance, **kwargs):
+    Post.objects.filter(pk__in=instance.__dict__.pop('_liked_post_ids', [])).update_likes_count()
+    purge_pages(ALL_PAGES)
+    invalidate_sidebar()
@@ -0,0 +1,62 @@
+from django.contrib.sitemaps import Sitemap, views as sitemap_views
+from django.db.models import Max
+from django.urls import reverse
+
+from blog.models import Post, Tag
+from blog.page_cache import FEEDS, cache_page_for_anonymous
+
+
+# Столько ссылок на одной странице карты сайта. Протокол разрешает до 50 000,
+# но отрисовка 1000 ссылок уже занимает около 0,2 с
+SITEMAP_PAGE_SIZE = 1000
+
+
+class PostSitemap(Sitemap):
+    limit = SITEMAP_PAGE_SIZE
+
+    def items(self):
+        # страницы нарезаются по id: порядок не меняется, когда публикуют новые посты
+        return Post.objects.order_by('id').values('slug', 'published_at')
+
+    def location(self, item):
+        return reverse('post_detail', args=[item['slug']])
+
+    def lastmod(self, item):
+        return item['published_at']
+
+    def get_latest_lastmod(self):
+        # по умолчанию Django перебрал бы все посты, а так это один шаг по индексу
+        return Post.objects.aggregate(latest=Max('published_at'))['latest']
+
+
+class TagSitemap(Sitemap):
+    limit = SITEMAP_PAGE_SIZE
+
+    def items(self):
+        return Tag.objects.order_by('id').values('title')
+
+    def location(self, item):
+        return reverse('tag_filter', args=[item['title']])
+
+
+sitemaps = {
+    'posts': PostSitemap,
+    'tags': TagSitemap,
+}
+
+
+def render_sitemap(response):
+    # TemplateResponse отрисовывается лениво, а кэшу страниц нужен готовый ответ
+    response.render()
+    response.page_dependencies = [FEEDS]
+    return response
+
+
+@cache_page_for_anonymous
+def index(request):
+    return render_sitemap(sitemap_views.index(request, sitemaps, sitemap_url_name='sitemap_section'))
+
+
+@cache_page_for_anonymous
+def section(request, section):
+    return render_sitemap(sitemap_views.sitemap(request, sitemaps, section=section))
@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from blog.likes import like_buffer
+from blog.management.commands.bench_views import COLD_CACHES, VIEW_QUERY_BUDGETS
+from blog.models import Comment, Post, Tag
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def save_test_image(name):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), 'navy').save(buffer, 'JPEG')
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+@override_settings(ALLOWED_HOSTS=['*'], CACHES=COLD_CACHES, MEDIA_ROOT=MEDIA_ROOT)
+class BlogTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        image = save_test_image('post.jpg')
+        # посты создаются через ORM, как в админке, чтобы заодно сработали все сигналы и колбэки после коммита
+        with cls.captureOnCommitCallbacks(execute=True):
+            users = [User.objects.create(username=f'user-{number}') for number in range(3)]
+            tags = [Tag.objects.create(title=f'tag-{number}') for number in range(4)]
+            now = timezone.now()
+            for number in range(8):
+                post = Post.objects.create(
+                    title=f'Пост {number}',
+                    text=f'Текст поста {number}',
+                    slug=f'post-{number}',
+                    image=image,
+                    published_at=now - timedelta(days=number),
+                    author=users[number % len(users)],
+                )
+                post.tags.set(tags[number % 2:number % 2 + 3])
+                post.likes.set(users[:number % len(users) + 1])
+                for user in users:
+                    Comment.objects.create(post=post, author=user, text='Комментарий', published_at=now)
+        cls.post = Post.objects.get(slug='post-0')
+        cls.tag = tags[2]
+        cls.user = User.objects.create(username='reader')
+
+
+class ViewQueryBudgetTests(BlogTestCase):
+
+    def assertViewWithinBudget(self, view_name, url):
+        # адрес не из INTERNAL_IPS, чтобы Debug Toolbar не добавлял своих запросов
+        with self.assertNumQueries(VIEW_QUERY_BUDGETS[view_name]):
+            response = self.client.get(url, REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(response.status_code, 200)
+
+    def test_index(self):
+        self.assertViewWithinBudget('index', reverse('index'))
+
+    def test_post_detail(self):
+        self.assertViewWithinBudget('post_detail', reverse('post_detail', args=[self.post.slug]))
+
+    def test_tag_filter(self):
+        self.assertViewWithinBudget('tag_filter', reverse('tag_filter', args=[self.tag.title]))
+
+    def test_contacts(self):
+        self.assertViewWithinBudget('contacts', reverse('contacts'))
+
+    def test_post_without_tags_on_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title='Пост без тегов',
+                text='Текст',
+                slug='post-without-tags',
+                image=save_test_image('post-without-tags.jpg'),
+                published_at=timezone.now(),
+                author=self.post.author,
+            )
+        response = self.client.get(reverse('index'), REMOTE_ADDR='192.0.2.1')
+        self.assertContains(response, 'Пост без тегов')
+
+
+class LikeTests(BlogTestCase):
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.like_url = reverse('like_post', args=[self.post.slug])
+        self.post_url = reverse('post_detail', args=[self.post.slug])
+
+    def tearDown(self):
+        # в буфере не должно остаться лайков для следующих тестов
+        like_buffer.flush()
+
+    @override_settings(LIKES_FLUSH_INTERVAL=0)
+    def test_like_is_saved_at_once_without_buffer(self):
+        likes_count = self.post.likes_count
+        response = self.client.post(self.like_url)
+        self.assertEqual(response.json(), {'liked': True, 'likes_count': likes_count + 1})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, likes_count + 1)
+        self.assertTrue(self.post.likes.filter(pk=self.user.pk).exists())
+
+    @override_settings(LIKES_FLUSH_INTERVAL=60)
+    def test_buffered_like_is_flushed(self):
+        likes_count = self.post.likes_count
+        self.client.post(self.like_url)
+        self.assertFalse(self.post.likes.filter(pk=self.user.pk).exists())
+        self.assertContains(self.client.get(self.post_url), 'data-liked="true"')
+
+        self.assertEqual(like_buffer.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, likes_count + 1)
+        self.assertTrue(self.post.likes.filter(pk=self.user.pk).exists())
+
+    @override_settings(LIKES_FLUSH_INTERVAL=0)
+    def test_unlike(self):
+        self.post.likes.add(self.user)
+        self.post.refresh_from_db()
+        self.assertContains(self.client.get(self.post_url), 'data-liked="true"')
+
+        response = self.client.delete(self.like_url)
+        self.assertEqual(response.json(), {'liked': False, 'likes_count': self.post.likes_count - 1})
+        self.assertFalse(self.post.likes.filter(pk=self.user.pk).exists())
+        self.assertNotContains(self.client.get(self.post_url), 'data-liked')
+
+
+class ApiTests(BlogTestCase):
+    def test_malformed_cursor(self):
+        response = self.client.get(reverse('api_post_list'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Некорректный курсор страницы'})
@@ -1,111 +1,216 @@
+from django.core.paginator import InvalidPage
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 from blog.models import Post, Tag
+from blog.page_cache import INDEX, SIDEBAR, cache_page_for_anonymous, post_dependency, tag_dependency, \
+    tag_posts_dependency
+from blog.pagination import KeysetPaginator
+from blog.renditions import serialize_rendition
+from blog.likes import like_buffer
+from blog.metrics import registry
+from blog.search import highlight_snippet, search_posts
+from blog.serializers import serialize_comment, serialize_post, serialize_related_post, serialize_tag
+from blog.sidebar import get_sidebar
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods
 
 
-def serialize_post(post):
-    return {
-        'title': post.title,
-        'teaser_text': post.text[:200],
-        'author': post.author_name,
-        'comments_amount': post.comments_count,
-        'image_url': post.image.url if post.image else None,
-        'published_at': post.published_at,
-        'slug': post.slug,
-        'tags': [serialize_tag(tag) for tag in post.related_tags],
-        'first_tag_title': post.related_tags[0].title,
-    }
+POSTS_PER_PAGE = 5
+COMMENTS_PER_PAGE = 20
+TAG_POSTS_PER_PAGE = 20
+SEARCH_RESULTS_LIMIT = 20
 
 
-def serialize_tag(tag):
-    return {
-        'title': tag.title,
-        'posts_with_tag': tag.posts_count,
-    }
+def get_page_url(page_number, cursor_name, cursor):
+    if page_number == 1:
+        return reverse('index')
+    return f"{reverse('index', args=[page_number])}?{cursor_name}={cursor}"
 
 
-def index(request):
-    popular_tags = Tag.objects.popular()[:5]
-    all_posts = Post.objects.prefetch_with_related_tags()
-    most_popular_posts = all_posts.popular().prefetch_with_related_author()[:5].fetch_with_comments_count()
-    fresh_posts = all_posts.order_by('published_at').prefetch_with_related_author().fetch_with_comments_count()
-    most_fresh_posts = list(fresh_posts)[:5]
+def get_comments_page(post, after=None):
+    comments = post.comments.select_related('author')
+    paginator = KeysetPaginator(comments, COMMENTS_PER_PAGE, descending=False)
+    comments_page = paginator.get_page(after=after)
+
+    next_url = None
+    if comments_page.has_next:
+        next_url = f"{reverse('post_comments', args=[post.slug])}?after={comments_page.next_cursor}"
+    return [serialize_comment(comment) for comment in comments_page], next_url
+
+
+@cache_page_for_anonymous
+def index(request, page=1):
+    if page < 1:
+        raise Http404('Страница не найдена')
+    fresh_posts = Post.objects.without_text().prefetch_with_related_tags().fetch_with_author()
+
+    paginator = KeysetPaginator(fresh_posts, POSTS_PER_PAGE)
+    try:
+        page_posts = paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            offset=(page - 1) * POSTS_PER_PAGE,
+        )
+    except InvalidPage:
+        raise Http404('Страница не найдена')
+    if page > 1 and not page_posts:
+        raise Http404('Страница не найдена')
+
+    previous_page_url = next_page_url = None
+    if page_posts.has_previous:
+        previous_page_url = get_page_url(page - 1, 'before', page_posts.previous_cursor)
+    if page_posts.has_next:
+        next_page_url = get_page_url(page + 1, 'after', page_posts.next_cursor)
 
     context = {
-        'most_popular_posts': [
-            serialize_post(post) for post in most_popular_posts
-        ],
-        'page_posts': [serialize_post(post) for post in most_fresh_posts],
-        'popular_tags': [serialize_tag(tag) for tag in popular_tags],
+        **get_sidebar(),
+        'page_posts': [serialize_post(post) for post in page_posts],
+        'page_number': page,
+        'previous_page_url': previous_page_url,
+        'next_page_url': next_page_url,
     }
-    return render(request, 'index.html', context)
+    response = render(request, 'index.html', context)
+    response.page_dependencies = [INDEX, SIDEBAR]
+    return response
 
 
+@cache_page_for_anonymous
 def post_detail(request, slug):
-    popular_tags = Tag.objects.popular()[:5]
-    all_posts = Post.objects.prefetch_with_related_tags()
-    most_popular_posts = all_posts.popular().prefetch_with_related_author()[:5] \
-        .fetch_with_comments_count()
-    posts = all_posts.popular().prefetch_with_related_author()
+    posts = Post.objects.prefetch_with_related_tags().fetch_with_author()
 
     post = get_object_or_404(posts, slug=slug)
 
-    comments = post.comments.select_related('author')
-    serialized_comments = []
-    for comment in comments:
-        serialized_comments.append({
-            'text': comment.text,
-            'published_at': comment.published_at,
-            'author': comment.author.username,
-        })
+    serialized_comments, comments_next_url = get_comments_page(post)
 
     related_tags = post.related_tags
+    related_posts = list(Post.objects.related_to(post).without_text().fetch_with_author())
+
+    # страницы зарегистрированных пользователей не кэшируются, поэтому свой лайк можно показать сразу
+    liked = False
+    if request.user.is_authenticated:
+        liked = like_buffer.get_pending(post.id, request.user.id)
+        if liked is None:
+            liked = post.likes.filter(pk=request.user.pk).exists()
 
     serialized_post = {
         'title': post.title,
         'text': post.text,
-        'author': post.author_name,
+        'author': post.author.username,
         'comments': serialized_comments,
-        'likes_amount': post.likes__count,
+        'comments_amount': post.comments_count,
+        'comments_next_url': comments_next_url,
+        'likes_amount': post.likes_count,
+        'liked': liked,
         'image_url': post.image.url if post.image else None,
+        'detail_image': serialize_rendition(post, 'detail'),
         'published_at': post.published_at,
         'slug': post.slug,
         'tags': [serialize_tag(tag) for tag in related_tags],
     }
 
     context = {
+        **get_sidebar(),
         'post': serialized_post,
-        'popular_tags': [serialize_tag(tag) for tag in popular_tags],
-        'most_popular_posts': [
-            serialize_post(post) for post in most_popular_posts
-        ],
+        'related_posts': [serialize_related_post(related_post) for related_post in related_posts],
     }
-    return render(request, 'post-details.html', context)
-
-
+    response = render(request, 'post-details.html', context)
+    response.page_dependencies = [
+        SIDEBAR,
+        post_dependency(post.id),
+        *[tag_dependency(tag.id) for tag in related_tags],
+        *[post_dependency(related_post.id) for related_post in related_posts],
+    ]
+    return response
+
+
+@cache_page_for_anonymous
+def post_comments(request, slug):
+    post = get_object_or_404(Post.objects.only('id', 'slug'), slug=slug)
+    try:
+        serialized_comments, next_url = get_comments_page(post, after=request.GET.get('after'))
+    except InvalidPage:
+        raise Http404('Страница не найдена')
+
+    response = JsonResponse({'comments': serialized_comments, 'next_url': next_url})
+    response.page_dependencies = [post_dependency(post.id)]
+    return response
+
+
+@require_http_methods(['POST', 'DELETE'])
+def like_post(request, slug):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Лайки ставят только зарегистрированные пользователи'}, status=401)
+    post = get_object_or_404(Post.objects.only('id', 'likes_count'), slug=slug)
+    liked = request.method == 'POST'
+    # лайк записывается в базу не сразу, а вместе с остальными при следующем сбросе буфера,
+    # поэтому счётчик для ответа считаем от того, что уже лежит в базе
+    liked_in_db = post.likes.filter(pk=request.user.pk).exists()
+    like_buffer.add(post.id, request.user.id, liked)
+    likes_count = post.likes_count + liked - liked_in_db
+    return JsonResponse({'liked': liked, 'likes_count': likes_count}, status=202)
+
+
+@cache_page_for_anonymous
 def tag_filter(request, tag_title):
-    popular_tags = Tag.objects.popular()
-    all_posts = Post.objects.prefetch_with_related_tags()
-    most_popular_posts = all_posts.popular().prefetch_with_related_author()[:5].fetch_with_comments_count()
-    most_popular_tags = popular_tags[:5]
+    tag = get_object_or_404(Tag.objects.only('id', 'title', 'posts_count'), title=tag_title)
+
+    tag_posts = tag.posts.without_text().prefetch_with_related_tags().fetch_with_author()
+    paginator = KeysetPaginator(tag_posts, TAG_POSTS_PER_PAGE)
+    try:
+        page_posts = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+    except InvalidPage:
+        raise Http404('Страница не найдена')
+
+    tag_url = reverse('tag_filter', args=[tag.title])
+    previous_page_url = next_page_url = None
+    if page_posts.has_previous:
+        previous_page_url = f'{tag_url}?before={page_posts.previous_cursor}'
+    if page_posts.has_next:
+        next_page_url = f'{tag_url}?after={page_posts.next_cursor}'
+
+    context = {
+        **get_sidebar(),
+        'tag': tag.title,
+        'tag_posts_count': tag.posts_count,
+        'posts': [serialize_post(post) for post in page_posts],
+        'previous_page_url': previous_page_url,
+        'next_page_url': next_page_url,
+    }
+    response = render(request, 'posts-list.html', context)
+    response.page_dependencies = [SIDEBAR, tag_dependency(tag.id), tag_posts_dependency(tag.id)]
+    return response
 
-    tag = get_object_or_404(popular_tags, title=tag_title)
 
-    related_posts = tag.posts.all()[:20].prefetch_with_related_tags().prefetch_with_related_author() \
-        .fetch_with_comments_count()
+def search(request):
+    # Результаты поиска не кэшируются: вариантов запроса слишком много
+    search_query = request.GET.get('q', '').strip()
+    results = search_posts(search_query, SEARCH_RESULTS_LIMIT)
+    found_posts = Post.objects.without_text().prefetch_with_related_tags().fetch_with_author() \
+        .in_bulk([post_id for post_id, _ in results])
 
     context = {
-        'tag': tag.title,
-        'popular_tags': [serialize_tag(tag) for tag in most_popular_tags],
-        'posts': [serialize_post(post) for post in related_posts],
-        'most_popular_posts': [
-            serialize_post(post) for post in most_popular_posts
+        **get_sidebar(),
+        'search_query': search_query,
+        'posts': [
+            {**serialize_post(found_posts[post_id]), 'search_snippet': highlight_snippet(snippet)}
+            for post_id, snippet in results
+            if post_id in found_posts
         ],
     }
     return render(request, 'posts-list.html', context)
 
 
+@cache_page_for_anonymous
 def contacts(request):
     # позже здесь будет код для статистики заходов на эту страницу
     # и для записи фидбека
     return render(request, 'contacts.html', {})
+
+
+def metrics(request):
+    # Счётчики свои у каждого процесса, поэтому при нескольких воркерах сводку удобнее собирать из лога
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404('Страница не найдена')
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
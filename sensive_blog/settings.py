@@ -1,5 +1,6 @@
 import os
 from environs import Env
+from marshmallow.validate import OneOf
 
 env = Env()
 env.read_env()
@@ -11,7 +12,12 @@ ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', [])
 
 SECRET_KEY = env.str('SECRET_KEY', 'REPLACE_ME')
 
-DEBUG = env.bool('DEBUG', True)
+# В боевом режиме отключено всё, что замедляет ответы ради удобства отладки
+PRODUCTION = env.bool('PRODUCTION', False)
+
+DEBUG = env.bool('DEBUG', not PRODUCTION)
+
+DEBUG_TOOLBAR = env.bool('DEBUG_TOOLBAR', DEBUG and not PRODUCTION)
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -20,7 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
+    'django.contrib.sitemaps',
     'blog',
 ]
 
@@ -36,16 +42,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'sensive_blog.urls'
 
 TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
-STATIC_ROOT = ''
+STATIC_ROOT = env.str('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
 
 TEMPLATES = [
     {
@@ -63,6 +72,57 @@ TEMPLATES = [
     },
 ]
 
+if PRODUCTION:
+    # шаблоны читаются с диска и компилируются один раз за жизнь процесса
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# Время ответа, число и время SQL-запросов, время отрисовки шаблонов и размер ответа по каждой странице:
+# заголовок Server-Timing, сводка в формате Prometheus на /metrics и строка в лог на каждый запрос.
+# В боевом режиме по умолчанию выключено: замеры оборачивают каждый SQL-запрос и каждый шаблон
+PERFORMANCE_METRICS = env.bool('PERFORMANCE_METRICS', not PRODUCTION)
+
+if PERFORMANCE_METRICS:
+    MIDDLEWARE.insert(0, 'blog.metrics.PerformanceMetricsMiddleware')
+    TEMPLATES[0]['BACKEND'] = 'blog.metrics.TimedDjangoTemplates'
+
+REPEATED_QUERIES_DETECTOR = env.bool('REPEATED_QUERIES_DETECTOR', False)
+REPEATED_QUERIES_THRESHOLD = env.int('REPEATED_QUERIES_THRESHOLD', 3)
+REPEATED_QUERIES_RAISE = env.bool('REPEATED_QUERIES_RAISE', False)
+
+if REPEATED_QUERIES_DETECTOR:
+    MIDDLEWARE.insert(1 if PERFORMANCE_METRICS else 0, 'blog.query_shapes.RepeatedQueriesMiddleware')
+
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', ['127.0.0.1'])
+
+METRICS_LOG_FILE = env.str('METRICS_LOG_FILE', '')
+
+if METRICS_LOG_FILE:
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'metrics': {'format': '%(asctime)s %(process)d %(message)s'},
+        },
+        'handlers': {
+            'metrics_file': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'filename': METRICS_LOG_FILE,
+                'maxBytes': 10 * 1024 * 1024,
+                'backupCount': 5,
+                'formatter': 'metrics',
+            },
+        },
+        'loggers': {
+            'blog.metrics': {'handlers': ['metrics_file'], 'level': 'INFO', 'propagate': False},
+        },
+    }
+
 WSGI_APPLICATION = 'sensive_blog.wsgi.application'
 
 DATABASES = {
@@ -70,9 +130,51 @@ DATABASES = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': env.str(
             'DATABASE_FILEPATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': env.int('DATABASE_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # сколько секунд ждать, пока другой процесс допишет в базу, прежде чем упасть с «database is locked»
+            'timeout': env.float('SQLITE_BUSY_TIMEOUT', 20),
+        },
+    }
+}
+
+# PRAGMA, которые выполняются при каждом подключении к SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': env.str('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': env.str('SQLITE_SYNCHRONOUS', 'normal'),
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    # отрицательное значение — размер кэша в килобайтах, а не в страницах
+    'cache_size': env.int('SQLITE_CACHE_SIZE', -64 * 1024),
+    'temp_store': 'memory',
+}
+
+# бэкенд кэша и его адрес по умолчанию
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379'),
+}
+
+cache_backend, default_cache_location = CACHE_BACKENDS[
+    env.str('CACHE_BACKEND', 'locmem', validate=OneOf(CACHE_BACKENDS))
+]
+
+CACHES = {
+    'default': {
+        'BACKEND': cache_backend,
+        'LOCATION': env.str('CACHE_LOCATION', default_cache_location),
     }
 }
 
+SIDEBAR_CACHE_TIMEOUT = env.int('SIDEBAR_CACHE_TIMEOUT', 300)
+
+PAGE_CACHE_TIMEOUT = env.int('PAGE_CACHE_TIMEOUT', 600)
+
+WARM_CACHE_ON_STARTUP = env.bool('WARM_CACHE_ON_STARTUP', False)
+
+LIKES_FLUSH_INTERVAL = env.float('LIKES_FLUSH_INTERVAL', 2)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',  # noqa: E501
@@ -100,5 +202,18 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+if PRODUCTION:
+    # Имена файлов с хэшем содержимого можно кэшировать навсегда, а рядом лежат сжатые .gz и .br копии.
+    # Файлы готовит collectstatic, отдаёт WhiteNoise
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'sensive_blog.storage.StaticFilesStorage'},
+    }
+    # без PRODUCTION статику отдаёт runserver, а папки STATIC_ROOT обычно нет
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+        'whitenoise.middleware.WhiteNoiseMiddleware',
+    )
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
@@ -0,0 +1,14 @@
+from django.core.exceptions import SuspiciousFileOperation
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    # В CSS вёрстки есть ссылки на файлы, которых нет в static: SVG-шрифты Font Awesome,
+    # картинки по путям выше папки static. Такие ссылки оставляем как есть, чтобы collectstatic не падал
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except (ValueError, SuspiciousFileOperation):
+            if content is not None:
+                raise
+            return name
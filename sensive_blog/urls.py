@@ -1,17 +1,37 @@
 from django.contrib import admin
-from blog import views
+from blog import api, feeds, sitemaps, views
 from django.urls import path, include
 
 from django.conf.urls.static import static
 from django.conf import settings
 
 urlpatterns = [
-    path("__debug__/", include("debug_toolbar.urls")),
     path('admin/', admin.site.urls),
     path('page/<int:page>', views.index, name='index'),
     path('post/<slug:slug>', views.post_detail, name='post_detail'),
+    path('post/<slug:slug>/comments', views.post_comments, name='post_comments'),
+    path('post/<slug:slug>/like', views.like_post, name='like_post'),
     path('tag/<slug:tag_title>', views.tag_filter, name='tag_filter'),
+    path('search/', views.search, name='search'),
     path('contacts/', views.contacts, name='contacts'),
+    path('metrics', views.metrics, name='metrics'),
+    path('feed/rss', feeds.latest_posts, {'feed_type': 'rss'}, name='latest_posts_rss'),
+    path('feed/atom', feeds.latest_posts, {'feed_type': 'atom'}, name='latest_posts_atom'),
+    path('tag/<slug:tag_title>/feed/rss', feeds.tag_posts, {'feed_type': 'rss'}, name='tag_posts_rss'),
+    path('tag/<slug:tag_title>/feed/atom', feeds.tag_posts, {'feed_type': 'atom'}, name='tag_posts_atom'),
+    path('sitemap.xml', sitemaps.index, name='sitemap'),
+    path('sitemap-<section>.xml', sitemaps.section, name='sitemap_section'),
+    path('api/posts/', api.post_list, name='api_post_list'),
+    path('api/posts/export', api.post_export, name='api_post_export'),
+    path('api/posts/<slug:slug>', api.post_detail, name='api_post_detail'),
+    path('api/tags/', api.tag_list, name='api_tag_list'),
+    path('api/tags/<slug:tag_title>/posts/', api.tag_post_list, name='api_tag_post_list'),
+    path('api/search/', api.search, name='api_search'),
     path('', views.index, name='index'),
 ]
+
+if settings.DEBUG_TOOLBAR:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
+
+# В боевом режиме картинки отдаёт веб-сервер, static() без DEBUG ничего не добавляет
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -8,9 +8,24 @@ https://docs.djangoproject.com/en/1.11/howto/deployment/wsgi/
 """
 
 import os
+import threading
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sensive_blog.settings')
 
 application = get_wsgi_application()
+
+# с кэшем в памяти процесса каждый воркер прогревал бы свой кэш, и все разом нагружали бы базу
+is_cache_shared = settings.CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+
+if settings.WARM_CACHE_ON_STARTUP and is_cache_shared:
+    from blog.management.commands.warm_cache import STARTUP_LOCK_KEY, STARTUP_LOCK_TIMEOUT
+
+    # кэш общий на всех воркеров, поэтому прогревает его только тот, кто первым взял ключ,
+    # а прогрев идёт в фоне, чтобы воркер сразу начал принимать запросы
+    if cache.add(STARTUP_LOCK_KEY, True, STARTUP_LOCK_TIMEOUT):
+        threading.Thread(target=call_command, args=['warm_cache'], daemon=True).start()